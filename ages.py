@@ -0,0 +1,76 @@
+"""
+ages.py
+
+Tracking of how long every cell has been alive, e.g. for colouring cells
+by age. Ages are kept in one byte per cell and saturate at MAX_AGE.
+"""
+
+from typing import List
+
+from engine import LifeEngine, np
+
+MAX_AGE = 255
+
+class CellAges():
+    """
+    CellAges holds the age of every cell of engine: 0 for dead cells, the
+    number of generations it has been alive for live ones. Call update()
+    after every step and reset() after the board was changed otherwise,
+    which restarts every live cell at age 1. With numpy the ages are a
+    uint8 array updated with two vectorised operations per generation.
+    """
+    def __init__(self, engine: LifeEngine):
+        self.engine = engine
+        self.reset()
+
+    def alive_map(self):
+        engine = self.engine
+        gol_map = getattr(engine, "gol_map", None)
+        if np is not None and isinstance(gol_map, np.ndarray):
+            return gol_map
+        if np is not None:
+            row_bytes = (engine.width + 7) // 8
+            packed = np.frombuffer(engine.to_packed(), dtype=np.uint8)
+            return np.unpackbits(packed.reshape(engine.height, row_bytes), axis=1,
+                                 count=engine.width, bitorder="little")
+
+        return engine.to_list()
+
+    def reset(self):
+        alive = self.alive_map()
+        if np is not None:
+            self.ages = alive.astype(np.uint8)
+        else:
+            self.ages = [bytearray(row) for row in alive]
+
+    def update(self):
+        alive = self.alive_map()
+        if np is not None:
+            ages = self.ages
+            np.add(ages, ages < MAX_AGE, out=ages, casting="unsafe")
+            ages *= alive
+            return
+
+        for y, row in enumerate(alive):
+            self.ages[y] = bytearray(min(age + 1, MAX_AGE) if cell else 0
+                                     for age, cell in zip(self.ages[y], row))
+
+    def restart_cell(self, y: int, x: int):
+        """
+        restart_cell restarts the age of the cell at y, x after it was
+        edited: 1 if it is alive now, 0 if not. The other cells keep their
+        ages.
+        """
+        self.ages[y][x] = self.engine.get_cell(y, x)
+
+    def get_age(self, y: int, x: int) -> int:
+        return int(self.ages[y][x])
+
+    def lookup(self, table: List[int]) -> List[List[int]]:
+        """
+        lookup maps every age through table, which has MAX_AGE + 1 entries
+        """
+        if np is not None:
+            return np.asarray(table)[self.ages].tolist()
+
+        return [[table[age] for age in row] for row in self.ages]
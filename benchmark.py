@@ -0,0 +1,309 @@
+"""
+benchmark.py
+
+Benchmarks for the Game of Life engines and the curses frontend. Runs
+headless, the frontend draws into a FakeScreen instead of a terminal.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from config import RunConfig
+from engine import BACKENDS, PythonLife, create_engine
+from gol import MAX_INFO_STR_LEN, RENDERERS, GameOfLife
+
+STANDARD_SIZES = (64, 256, 1024, 4096)
+
+# Terminal size (lines, columns) of the rendering benchmark
+RENDER_TERMINAL = (80, 200)
+
+# Gosper glider gun, "O" is a live cell
+GLIDER_GUN = [
+    "........................O...........",
+    "......................O.O...........",
+    "............OO......OO............OO",
+    "...........O...O....OO............OO",
+    "OO........O.....O...OO..............",
+    "OO........O...O.OO....O.O...........",
+    "..........O.....O.......O...........",
+    "...........O...O....................",
+    "............OO......................",
+]
+
+R_PENTOMINO = [
+    ".OO",
+    "OO.",
+    ".O.",
+]
+
+WORKLOADS = ("soup-0.1", "soup-0.3", "soup-0.5", "glider-gun", "r-pentomino")
+
+class FakeScreen():
+    """
+    FakeScreen stands in for a curses window, it only counts the calls
+    that would have been sent to the terminal.
+    """
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.calls = 0
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def move(self, y: int, x: int):
+        self.calls += 1
+
+    def addstr(self, *args):
+        self.calls += 1
+
+    def addnstr(self, *args):
+        self.calls += 1
+
+    def addch(self, *args):
+        self.calls += 1
+
+    def attrset(self, attr: int):
+        pass
+
+    def refresh(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def keypad(self, on_off: bool):
+        pass
+
+    def nodelay(self, on_off: int):
+        pass
+
+    def getch(self) -> int:
+        return -1
+
+def centered(rows: List[str], size: int) -> List[Tuple[int, int]]:
+    top = (size - len(rows)) // 2
+    left = (size - len(rows[0])) // 2
+
+    return [(top + y, left + x) for y, row in enumerate(rows)
+            for x, symbol in enumerate(row) if symbol == "O"]
+
+def workload_pattern(workload: str, size: int, seed: int) -> List[Tuple[int, int]]:
+    """
+    workload_pattern returns the live cells of a standard workload
+    """
+    if workload.startswith("soup-"):
+        density = float(workload[len("soup-"):])
+        rand = random.Random(seed)
+        return [(y, x) for y in range(size) for x in range(size) if rand.random() < density]
+    if workload == "glider-gun":
+        return centered(GLIDER_GUN, size)
+    if workload == "r-pentomino":
+        return centered(R_PENTOMINO, size)
+
+    raise ValueError(f"Unknown workload '{workload}', expected one of {WORKLOADS}")
+
+def timed(function: Callable[[], None]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def close_engine(engine):
+    if hasattr(engine, "close"):
+        engine.close()
+
+def measure_peak_memory(backend: str, size: int, pattern: List[Tuple[int, int]],
+                        rule: str, generations: int=2) -> int:
+    """
+    measure_peak_memory returns the peak traced memory in bytes of creating
+    an engine, loading pattern and stepping it a few generations
+    """
+    tracemalloc.start()
+    engine = create_engine(backend, size, size, pattern, rule)
+    engine.step(generations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    close_engine(engine)
+
+    return peak
+
+def run_case(backend: str, workload: str, size: int, generations: int,
+             seed: int=0, draw: bool=True, rule: str="B3/S23") -> Dict:
+    """
+    run_case benchmarks one backend on one workload, board size and rule,
+    every phase is timed separately
+    """
+    pattern = workload_pattern(workload, size, seed)
+    screen = FakeScreen(size + 10, size + MAX_INFO_STR_LEN + 2)
+    config = RunConfig(backend, rule, size, size, seed)
+    # Only the engine is timed, the history of the frontend is not needed
+    gol = GameOfLife(stdscr=screen, config=config, history=False)
+    engine = gol.engine
+    phases: Dict[str, float] = {}
+
+    phases["generate_random_map"] = timed(gol.generate_random_map)
+
+    engine.clear()
+    phases["load_pattern"] = timed(lambda: engine.load_pattern(pattern))
+
+    if hasattr(engine, "check_cell"):
+        new_gol_map = engine.to_list()
+        cells = min(size * size, 10000)
+        start = time.perf_counter()
+        for i in range(cells):
+            engine.check_cell(i % size, i // size, new_gol_map)
+        phases["check_cell"] = (time.perf_counter() - start) / cells * size * size
+        engine.alive = sum(map(sum, engine.to_list()))
+
+    phases["step"] = 0.0
+    phases["draw_map"] = 0.0
+    for _ in range(generations):
+        phases["step"] += timed(engine.game_step)
+        if draw:
+            phases["draw_map"] += timed(gol.draw_map)
+    draw_calls = screen.calls
+    close_engine(engine)
+
+    generations_per_second = generations / phases["step"] if phases["step"] > 0 else float("inf")
+    return {
+        "config": config.to_dict(),
+        "backend": backend,
+        "rule": str(engine.rule),
+        "workload": workload,
+        "size": size,
+        "seed": seed,
+        "generations": generations,
+        "alive": gol.alive,
+        "generations_per_second": generations_per_second,
+        "cells_per_second": generations_per_second * size * size,
+        "peak_memory_bytes": measure_peak_memory(backend, size, pattern, rule),
+        "draw_calls": draw_calls,
+        "phases": phases,
+    }
+
+def print_results(results: List[Dict]):
+    print(f"{'backend':<10} {'rule':<14} {'workload':<12} {'size':>5} {'gens/s':>10} "
+          f"{'cells/s':>12} {'peak MiB':>9}  phases (s)")
+    for result in results:
+        phases = ", ".join(f"{name} {seconds:.4f}" for name, seconds in result["phases"].items())
+        print(f"{result['backend']:<10} {result['rule']:<14} {result['workload']:<12} "
+              f"{result['size']:>5} "
+              f"{result['generations_per_second']:>10.1f} {result['cells_per_second']:>12.3g} "
+              f"{result['peak_memory_bytes'] / 2 ** 20:>9.2f}  {phases}")
+
+def measure_allocations(step: Callable[[], None], generations: int) -> float:
+    """
+    measure_allocations returns the average number of bytes allocated on
+    top of the live memory while computing one generation
+    """
+    tracemalloc.start()
+    allocated = 0
+
+    for _ in range(generations):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+
+    tracemalloc.stop()
+    return allocated / generations
+
+def benchmark_allocations(size: int, generations: int, density: float=0.3):
+    """
+    benchmark_allocations compares a freshly allocated map per generation
+    (before) with the double-buffered game_step (after)
+    """
+    rand = random.Random(0)
+    pattern = [(y, x) for y in range(size) for x in range(size) if rand.random() < density]
+
+    engine = PythonLife(size, size, pattern)
+    def allocating_step():
+        engine.gol_map = engine.calculate_new_map()
+
+    before = measure_allocations(allocating_step, generations)
+
+    engine = PythonLife(size, size, pattern)
+    after = measure_allocations(engine.game_step, generations)
+
+    print(f"Allocations per generation on a {size}x{size} board:")
+    print(f"  before (new map):      {before / 1024:10.1f} KiB")
+    print(f"  after (double buffer): {after / 1024:10.1f} KiB")
+
+def benchmark_rendering(frames: int, backend: str="python", seed: int=0):
+    """
+    benchmark_rendering compares the frames per second of the renderers
+    on a RENDER_TERMINAL sized terminal, both redrawing the whole game
+    field every frame and only redrawing what changed after a step
+    """
+    lines, columns = RENDER_TERMINAL
+    print(f"Rendering a {lines}x{columns} terminal, soup of density 0.3:")
+
+    for renderer in RENDERERS:
+        screen = FakeScreen(lines, columns)
+        gol = GameOfLife(stdscr=screen, config=RunConfig(backend, seed=seed, density=0.3),
+                         renderer=renderer, history=False)
+        gol.generate_random_map()
+
+        full = 0.0
+        for _ in range(frames):
+            gol.invalidate_screen()
+            full += timed(gol.draw_map)
+        full_calls = screen.calls / frames
+
+        screen.calls = 0
+        incremental = 0.0
+        for _ in range(frames):
+            gol.game_step()
+            incremental += timed(gol.draw_map)
+        incremental_calls = screen.calls / frames
+
+        print(f"  {renderer:<5} full redraw {frames / full:8.1f} fps ({full_calls:7.0f} calls), "
+              f"after a step {frames / incremental:8.1f} fps ({incremental_calls:7.0f} calls)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Game of Life benchmarks")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="engines to benchmark, unavailable ones are skipped")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--rules", nargs="+", default=["B3/S23"],
+                        help="rules to sweep, in B/S notation or by name")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[64, 256],
+                        help=f"board sizes, the standard sizes are {STANDARD_SIZES}")
+    parser.add_argument("--generations", type=int, default=10, help="generations to measure")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random soups")
+    parser.add_argument("--no-draw", action="store_true", help="skip the draw_map phase")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--allocations", action="store_true",
+                        help="only compare the allocations per generation of the python engine")
+    parser.add_argument("--rendering", action="store_true",
+                        help="only compare the frames per second of the renderers")
+    args = parser.parse_args()
+
+    if args.allocations:
+        benchmark_allocations(args.sizes[0], args.generations)
+        sys.exit(0)
+
+    if args.rendering:
+        benchmark_rendering(args.generations, seed=args.seed)
+        sys.exit(0)
+
+    results = []
+    for backend in args.backends:
+        for rule in args.rules:
+            try:
+                results += [run_case(backend, workload, size, args.generations, args.seed,
+                                     not args.no_draw, rule)
+                            for size in args.sizes for workload in args.workloads]
+            except (ImportError, ValueError) as e:
+                print(f"Skipping {backend} with {rule}: {e}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
@@ -0,0 +1,147 @@
+"""
+checkpoint.py
+
+Periodic checkpoints of long runs. The board is captured bit-packed on
+the simulation thread, which is the only time the simulation waits, and
+written as a snapshot on a background thread. Only the newest checkpoints
+are kept.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from engine import LifeEngine
+from snapshot import Snapshot, write_snapshot
+
+DEFAULT_KEEP = 3
+
+class Checkpointer():
+    """
+    Checkpointer writes a checkpoint of engine into directory every
+    generations generations and / or every seconds seconds, whichever comes
+    first. Call maybe_checkpoint() after every step and close() at the end
+    of the run.
+
+    While a checkpoint is still being written, further ones are skipped
+    instead of queued, so a slow disk cannot make memory grow. The time the
+    simulation was stalled by capturing the board is kept in capture_time
+    (last) and total_capture_time, the time spent writing in the background
+    in write_time.
+
+    A failed write does not stop the run: it is counted in failed and kept
+    in error, the next checkpoint is attempted as usual.
+    """
+    def __init__(self, engine: LifeEngine, directory: str, generations: Optional[int]=None,
+                 seconds: Optional[float]=None, keep: int=DEFAULT_KEEP,
+                 compression: str="none"):
+        if generations is None and seconds is None:
+            raise ValueError("Checkpoints need an interval in generations or seconds")
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1, got {keep}")
+
+        self.engine = engine
+        self.directory = directory
+        self.generations = generations
+        self.seconds = seconds
+        self.keep = keep
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+        self.last_generation = engine.generation
+        self.last_time = time.monotonic()
+
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+        self.error: Optional[BaseException] = None
+        self.capture_time = 0.0
+        self.total_capture_time = 0.0
+        self.write_time = 0.0
+
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self.pending: Optional[Future] = None
+
+    def path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"checkpoint-{generation:012d}.snap")
+
+    def checkpoints(self) -> List[str]:
+        """
+        checkpoints returns the paths of the written checkpoints, oldest first.
+        They are ordered by time written, since a resumed run may write
+        generations older than the ones a previous run left behind.
+        """
+        return sorted(glob.glob(os.path.join(self.directory, "checkpoint-*.snap")),
+                      key=lambda path: (os.path.getmtime(path), path))
+
+    def latest(self) -> Optional[str]:
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def is_due(self) -> bool:
+        if (self.generations is not None
+                and self.engine.generation - self.last_generation >= self.generations):
+            return True
+
+        return self.seconds is not None and time.monotonic() - self.last_time >= self.seconds
+
+    def maybe_checkpoint(self, cursor: Tuple[int, int]=(0, 0)) -> bool:
+        """
+        maybe_checkpoint starts writing a checkpoint if one is due, returns
+        whether it did
+        """
+        if not self.is_due():
+            return False
+
+        if self.pending is not None:
+            if not self.pending.done():
+                self.skipped += 1
+                return False
+            self.finish_pending()
+
+        self.checkpoint(cursor)
+        return True
+
+    def finish_pending(self):
+        # Waits for the pending write, a failure is recorded rather than raised
+        error = self.pending.exception()
+        self.pending = None
+        if error is not None:
+            self.failed += 1
+            self.error = error
+
+    def checkpoint(self, cursor: Tuple[int, int]=(0, 0)):
+        """
+        checkpoint captures the board and writes it in the background
+        """
+        engine = self.engine
+        start = time.perf_counter()
+        snapshot = Snapshot(engine.width, engine.height, engine.generation, engine.alive,
+                            cursor, engine.rule, self.compression, engine.to_packed())
+        self.capture_time = time.perf_counter() - start
+        self.total_capture_time += self.capture_time
+
+        self.last_generation = engine.generation
+        self.last_time = time.monotonic()
+        self.pending = self.writer.submit(self.write, snapshot)
+
+    def write(self, snapshot: Snapshot):
+        start = time.perf_counter()
+        write_snapshot(self.path(snapshot.generation), snapshot)
+
+        for path in self.checkpoints()[:-self.keep]:
+            os.remove(path)
+
+        self.write_time = time.perf_counter() - start
+        self.written += 1
+
+    def close(self):
+        """
+        close waits for the checkpoint being written, a failure of it is
+        recorded in failed and error like any other
+        """
+        self.writer.shutdown()
+        if self.pending is not None:
+            self.finish_pending()
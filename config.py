@@ -0,0 +1,90 @@
+"""
+config.py
+
+Configuration of a run. Everything random in a run is drawn from RNG
+instances seeded by its RunConfig, never from the global random module,
+so runs with the same config are reproducible.
+"""
+
+import random
+from typing import Dict, Optional, Union
+
+from engine import LifeEngine, create_engine
+from patterns import Pattern, place_pattern, read_pattern
+from rules import CONWAY, Rule, to_rule
+
+class RunConfig():
+    """
+    RunConfig holds the backend, rule, board size, initial board and seed of
+    a run. The initial board is the pattern file at pattern or, without
+    one, a random map of the given density (see
+    LifeEngine.generate_random_map). Without a rule the rule of the pattern
+    file is used, or B3/S23. width and height may be left out when the
+    board is sized by the terminal.
+
+    With a seed, every random choice is reproducible. Each consumer draws
+    from its own stream (see rng), so e.g. the shimmer table of the
+    frontend does not change the random maps of a run.
+    """
+    def __init__(self, backend: str="python", rule: Optional[Union[str, Rule]]=None,
+                 width: Optional[int]=None, height: Optional[int]=None,
+                 seed: Optional[int]=None, density: Optional[float]=None,
+                 pattern: Optional[str]=None):
+        self.backend = backend
+        self.rule = rule
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.density = density
+        self.pattern = pattern
+        self.loaded_pattern: Optional[Pattern] = None
+
+    def rng(self, stream: str) -> random.Random:
+        """
+        rng returns a new RNG for the named stream, seeded from the seed of
+        the run (unseeded without one)
+        """
+        return random.Random(None if self.seed is None else f"{self.seed}/{stream}")
+
+    def read_pattern(self) -> Optional[Pattern]:
+        if self.pattern is not None and self.loaded_pattern is None:
+            self.loaded_pattern = read_pattern(self.pattern)
+
+        return self.loaded_pattern
+
+    def effective_rule(self) -> Rule:
+        if self.rule is not None:
+            return to_rule(self.rule)
+
+        pattern = self.read_pattern()
+        return pattern.rule if pattern is not None and pattern.rule else CONWAY
+
+    def create_engine(self, **options) -> LifeEngine:
+        """
+        create_engine returns a new engine holding the initial board of the
+        run, options are passed on to the engine
+        """
+        if self.width is None or self.height is None:
+            raise ValueError("The board size of the run is not configured")
+
+        engine = create_engine(self.backend, self.width, self.height,
+                               rule=self.effective_rule(), **options)
+
+        pattern = self.read_pattern()
+        if pattern is not None:
+            place_pattern(engine, pattern)
+        else:
+            engine.generate_random_map(self.density, self.rng("map").getrandbits(64))
+
+        return engine
+
+    def to_dict(self) -> Dict:
+        return {
+            "backend": self.backend,
+            "rule": str(self.effective_rule()),
+            "width": self.width,
+            "height": self.height,
+            "seed": self.seed,
+            "density": self.density,
+            "pattern": self.pattern,
+        }
@@ -0,0 +1,94 @@
+"""
+cycles.py
+
+Detection of still lifes and oscillating boards. Every observed generation
+is hashed with LifeEngine.digest, a board that repeats an earlier digest
+has entered a cycle.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+
+from engine import LifeEngine
+
+# Number of digests kept by default, longer periods are not detected
+DEFAULT_WINDOW = 4096
+
+class Cycle():
+    """
+    Cycle describes a board that repeats every period generations from
+    generation start on. A still life has period 1.
+    """
+    def __init__(self, start: int, period: int):
+        self.start = start
+        self.period = period
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Cycle) and (self.start, self.period) == (other.start, other.period)
+
+    def __repr__(self) -> str:
+        return f"Cycle(start={self.start}, period={self.period})"
+
+class CycleDetector():
+    """
+    CycleDetector remembers the digests of the last window observed
+    generations. Observe every generation to get the exact start of a
+    cycle, with gaps in between the start is only an upper bound.
+    """
+    def __init__(self, engine: LifeEngine, window: int=DEFAULT_WINDOW):
+        self.engine = engine
+        self.window = window
+        self.digests: "OrderedDict[bytes, int]" = OrderedDict()
+        self.cycle: Optional[Cycle] = None
+
+    def reset(self):
+        """
+        reset forgets all digests, needed whenever the board was changed by
+        anything other than stepping it
+        """
+        self.digests.clear()
+        self.cycle = None
+
+    def observe(self) -> Optional[Cycle]:
+        """
+        observe hashes the current generation and returns the cycle once
+        the board repeats
+        """
+        if self.cycle is not None:
+            return self.cycle
+
+        generation = self.engine.generation
+        digest = self.engine.digest()
+
+        seen = self.digests.get(digest)
+        if seen is not None and seen < generation:
+            self.cycle = Cycle(seen, generation - seen)
+            return self.cycle
+
+        self.digests[digest] = generation
+        if len(self.digests) > self.window:
+            self.digests.popitem(last=False)
+
+        return None
+
+def run_until_cycle(engine: LifeEngine, stop: int, fast_forward: bool=False,
+                    window: int=DEFAULT_WINDOW) -> Optional[Cycle]:
+    """
+    run_until_cycle steps engine until generation stop or until the board
+    repeats, whichever comes first. With fast_forward the board then jumps
+    straight to generation stop, only stepping the remainder of the period.
+    Returns the cycle, or None if none was found before stop.
+    """
+    detector = CycleDetector(engine, window)
+
+    while engine.generation < stop:
+        cycle = detector.observe()
+        if cycle is not None:
+            if fast_forward:
+                engine.step((stop - engine.generation) % cycle.period)
+                engine.generation = stop
+            return cycle
+
+        engine.game_step()
+
+    return detector.observe()
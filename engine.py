@@ -0,0 +1,847 @@
+"""
+engine.py
+
+Simulation core of the Game of Life. The engines in here know nothing
+about curses, so they can be used headless for batch runs and benchmarks.
+"""
+
+import hashlib
+import importlib
+import random
+import sys
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from rules import CONWAY, Rule, to_rule
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MIN_RAND_CELLS = 3
+MAX_RAND_CELLS = 1000
+
+# Random numbers drawn at once when filling a board at a density
+RANDOM_STRIPE_CELLS = 1 << 20
+
+# A cell of a soup is alive if its 16 bit random number is below
+# density * RANDOM_RANGE
+RANDOM_RANGE = 1 << 16
+
+def random_stripe(seed: int, index: int, cells: int) -> array:
+    """
+    random_stripe returns cells random 16 bit numbers for stripe index of
+    a soup. They are the output of SHAKE-256, so they are the same on every
+    machine, with or without numpy.
+    """
+    numbers = array("H", hashlib.shake_256(f"{seed}/{index}".encode("ascii")).digest(2 * cells))
+    if sys.byteorder == "big":
+        numbers.byteswap()
+
+    return numbers
+
+def unpack_cells(packed, width: int, height: int) -> Tuple[array, array]:
+    """
+    unpack_cells returns the row and column coordinates of the live cells
+    of a board bit-packed like LifeEngine.to_packed
+    """
+    row_bytes = (width + 7) // 8
+    ys = array("q")
+    xs = array("q")
+
+    if np is not None:
+        rows = np.frombuffer(packed, dtype=np.uint8, count=height * row_bytes)
+        cells = np.nonzero(np.unpackbits(rows.reshape(height, row_bytes), axis=1,
+                                         count=width, bitorder="little"))
+        ys.frombytes(cells[0].astype(np.int64).tobytes())
+        xs.frombytes(cells[1].astype(np.int64).tobytes())
+        return ys, xs
+
+    mask = (1 << width) - 1
+    for y in range(height):
+        row = int.from_bytes(packed[y * row_bytes:(y + 1) * row_bytes], "little") & mask
+        while row:
+            # Lowest set bit first
+            ys.append(y)
+            xs.append((row & -row).bit_length() - 1)
+            row &= row - 1
+
+    return ys, xs
+
+class LifeEngine():
+    """
+    LifeEngine is the interface every stepping engine implements. It owns
+    the board state (generation, alive) and advances it with game_step.
+    The board is a torus of width x height cells, evolving under rule
+    (a Rule or a rulestring like "B36/S23").
+    """
+    # Whether rules with birth on 0 neighbours can be run
+    supports_b0 = True
+
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY):
+        if width < 1 or height < 1:
+            raise ValueError(f"Board size must be positive, got {width}x{height}")
+
+        self.width = width
+        self.height = height
+        self.rule = to_rule(rule)
+        self.alive = 0
+        self.generation = 0
+
+        self.clear()
+        if pattern is not None:
+            self.load_pattern(pattern)
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_cell(self, y: int, x: int) -> int:
+        raise NotImplementedError
+
+    def set_cell(self, y: int, x: int, value: int):
+        raise NotImplementedError
+
+    def game_step(self):
+        raise NotImplementedError
+
+    def step(self, n: int):
+        """
+        step advances the board by n generations, engines that can skip
+        ahead faster than one generation at a time override this
+        """
+        for _ in range(n):
+            self.game_step()
+
+    def toggle_cell(self, y: int, x: int) -> int:
+        res = 1 - self.get_cell(y, x)
+        self.set_cell(y, x, res)
+
+        return res
+
+    def load_pattern(self, pattern: Iterable[Tuple[int, int]]):
+        """
+        load_pattern sets every (y, x) coordinate of pattern alive,
+        coordinates wrap around the edges of the board
+        """
+        for y, x in pattern:
+            self.set_cell(y % self.height, x % self.width, 1)
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        """
+        load_arrays sets the cells (top + ys[i], left + xs[i]) alive, like
+        load_pattern but with the coordinates in two parallel arrays, which
+        engines with an array based board load without a Python loop
+        """
+        self.load_pattern(zip((top + y for y in ys), (left + x for x in xs)))
+
+    def to_list(self) -> List[List[int]]:
+        return [[self.get_cell(y, x) for x in range(self.width)]
+                for y in range(self.height)]
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        """
+        live_cells returns the (y, x) coordinates of all live cells
+        """
+        return {(y, x) for y, row in enumerate(self.to_list())
+                for x, cell in enumerate(row) if cell}
+
+    def digest(self) -> bytes:
+        """
+        digest returns a hash of the board, equal boards have equal digests
+        """
+        return hashlib.blake2b(array("q", sorted(y * self.width + x for y, x in
+                                                 self.live_cells())).tobytes(),
+                               digest_size=16).digest()
+
+    def to_packed(self) -> bytes:
+        """
+        to_packed returns the board bit-packed row by row, every row takes
+        (width + 7) // 8 bytes and bit x % 8 of byte x // 8 is column x
+        """
+        row_bytes = (self.width + 7) // 8
+        packed = bytearray(row_bytes * self.height)
+        for y, x in self.live_cells():
+            packed[y * row_bytes + (x >> 3)] |= 1 << (x & 7)
+
+        return bytes(packed)
+
+    def load_packed(self, packed):
+        """
+        load_packed replaces the board with packed, a buffer in the format
+        of to_packed. The generation is kept.
+        """
+        generation = self.generation
+        self.clear()
+        self.load_arrays(*unpack_cells(packed, self.width, self.height))
+        self.generation = generation
+
+    def iter_generations(self, start: Optional[int]=None, stop: Optional[int]=None,
+                         every: int=1, deltas: bool=False) -> Iterator:
+        """
+        iter_generations advances the board to generation start and then
+        lazily yields every k-th generation before stop (forever if stop is
+        None). Generations in between are only stepped through, never
+        copied, so engines with a fast step(n) skip them entirely.
+
+        Yields (generation, map) tuples with map as returned by to_list, or
+        with deltas (generation, births, deaths) where births and deaths are
+        the sets of cells that changed since the previously yielded
+        generation. The first delta holds every live cell as a birth.
+        """
+        if every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        if start is None:
+            start = self.generation
+        if start < self.generation:
+            raise ValueError(f"Cannot go back to generation {start}, "
+                             f"the board is at generation {self.generation}")
+
+        if stop is not None and start >= stop:
+            return
+
+        self.step(start - self.generation)
+        previous: Set[Tuple[int, int]] = set()
+
+        while True:
+            if deltas:
+                cells = self.live_cells()
+                yield self.generation, cells - previous, previous - cells
+                previous = cells
+            else:
+                yield self.generation, self.to_list()
+
+            # The board is left at the last yielded generation
+            if stop is not None and self.generation + every >= stop:
+                return
+            self.step(every)
+
+    def generate_random_map(self, density: Optional[float]=None, seed: Optional[int]=None):
+        """
+        generate_random_map replaces the board with a random soup in which
+        every cell is alive with probability density. Without a density
+        between MIN_RAND_CELLS and MAX_RAND_CELLS cells are set alive.
+
+        The soup only depends on seed and the board size: it is the same
+        for every engine, on every machine and with or without numpy.
+        density is resolved in steps of 1 / RANDOM_RANGE. Soups are drawn in
+        bulk, in O(width * height), with numpy.
+        """
+        if density is not None and not 0 <= density <= 1:
+            raise ValueError(f"density must be between 0 and 1, got {density}")
+
+        w, h = self.width, self.height
+        size = w * h
+        if seed is None:
+            seed = random.Random().getrandbits(64)
+
+        if density is None:
+            rand = random.Random(seed)
+            count = min(rand.randint(MIN_RAND_CELLS, MAX_RAND_CELLS), size)
+            cells = rand.sample(range(size), count)
+
+            self.clear()
+            self.load_arrays([cell // w for cell in cells], [cell % w for cell in cells])
+            return
+
+        # Draw stripes of rows, so that no more than RANDOM_STRIPE_CELLS
+        # random numbers are held at once
+        threshold = round(density * RANDOM_RANGE)
+        stripe_rows = max(1, RANDOM_STRIPE_CELLS // w)
+
+        if np is None:
+            cells = []
+            for index, y0 in enumerate(range(0, h, stripe_rows)):
+                numbers = random_stripe(seed, index, (min(y0 + stripe_rows, h) - y0) * w)
+                cells.extend(y0 * w + i for i, number in enumerate(numbers)
+                             if number < threshold)
+
+            self.clear()
+            self.load_arrays([cell // w for cell in cells], [cell % w for cell in cells])
+            return
+
+        packed = np.empty((h, (w + 7) // 8), dtype=np.uint8)
+        for index, y0 in enumerate(range(0, h, stripe_rows)):
+            y1 = min(y0 + stripe_rows, h)
+            numbers = np.frombuffer(random_stripe(seed, index, (y1 - y0) * w), dtype=np.uint16)
+            packed[y0:y1] = np.packbits((numbers < threshold).reshape(y1 - y0, w), axis=1,
+                                        bitorder="little")
+
+        self.clear()
+        self.load_packed(packed.reshape(-1))
+
+class PythonLife(LifeEngine):
+    """
+    PythonLife stores the board as a nested list and checks every cell
+    with plain Python loops. The next generation is written into a second,
+    preallocated map and the two are swapped after every step, so stepping
+    does not allocate new maps.
+    """
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        if getattr(self, "gol_map", None) is None:
+            # Wrapped left and right neighbour of every column
+            self.columns = [((x - 1) % self.width, x, (x + 1) % self.width)
+                            for x in range(self.width)]
+            self.empty_row = [0] * self.width
+            self.gol_map: List[List[int]] = \
+                [[0 for x in range(self.width)] for y in range(self.height)]
+            self.next_gol_map: List[List[int]] = \
+                [[0 for x in range(self.width)] for y in range(self.height)]
+            return
+
+        for row, next_row in zip(self.gol_map, self.next_gol_map):
+            row[:] = self.empty_row
+            next_row[:] = self.empty_row
+
+    def get_cell(self, y: int, x: int) -> int:
+        return self.gol_map[y][x]
+
+    def set_cell(self, y: int, x: int, value: int):
+        self.alive += value - self.gol_map[y][x]
+        self.gol_map[y][x] = value
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        gol_map = self.gol_map
+        w, h = self.width, self.height
+        for y, x in zip(ys, xs):
+            gol_map[(top + y) % h][(left + x) % w] = 1
+
+        self.alive = sum(map(sum, gol_map))
+
+    def to_list(self) -> List[List[int]]:
+        return [row[:] for row in self.gol_map]
+
+    def to_packed(self) -> bytes:
+        if np is None:
+            return super().to_packed()
+
+        return np.packbits(np.array(self.gol_map, dtype=np.uint8), axis=1,
+                           bitorder="little").tobytes()
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        return {(y, x) for y, row in enumerate(self.gol_map)
+                for x, cell in enumerate(row) if cell}
+
+    def digest(self) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        for row in self.gol_map:
+            digest.update(bytes(row))
+
+        return digest.digest()
+
+    def check_cell(self, x: int, y: int, new_gol_map: List[List[int]]):
+        sum_neighbours = 0
+
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                row = (y + i) % self.height
+                column = (x + j) % self.width
+
+                sum_neighbours += self.gol_map[row][column]
+
+        state = self.gol_map[y][x]
+        new_gol_map[y][x] = self.rule.table[state * 9 + sum_neighbours - state]
+
+    def calculate_region(self, new_gol_map: List[List[int]], y0: int, y1: int,
+                         columns: List[Tuple[int, int, int]]):
+        """
+        calculate_region writes the next generation of rows y0 to y1 and the
+        given columns into new_gol_map, walking the map row by row
+        """
+        gol_map = self.gol_map
+        table = self.rule.table
+        h = self.height
+
+        for y in range(y0, y1):
+            above = gol_map[(y - 1) % h]
+            row = gol_map[y]
+            below = gol_map[(y + 1) % h]
+            new_row = new_gol_map[y]
+
+            for left, x, right in columns:
+                state = row[x]
+                new_row[x] = table[state * 9 + above[left] + above[x] + above[right]
+                                   + row[left] + row[right]
+                                   + below[left] + below[x] + below[right]]
+
+    def calculate_new_map(self, new_gol_map: Optional[List[List[int]]]=None) -> List[List[int]]:
+        """
+        calculate_new_map writes the next generation into new_gol_map,
+        a new map is allocated when none is given
+        """
+        if new_gol_map is None:
+            new_gol_map = [[0 for x in range(self.width)] for y in range(self.height)]
+
+        self.calculate_region(new_gol_map, 0, self.height, self.columns)
+
+        return new_gol_map
+
+    def game_step(self):
+        self.calculate_new_map(self.next_gol_map)
+        self.gol_map, self.next_gol_map = self.next_gol_map, self.gol_map
+        self.alive = sum(map(sum, self.gol_map))
+        self.generation += 1
+
+class TiledLife(PythonLife):
+    """
+    TiledLife splits the board into tile_size x tile_size tiles and only
+    recomputes the tiles that changed in the previous generation and their
+    neighbours. Every other tile did not change in the previous generation,
+    so the buffer of that generation already holds it and nothing has to be
+    copied. skipped_tiles holds the number of tiles skipped in the last step.
+    """
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY, tile_size: int=16):
+        self.tile_size = tile_size
+        self.tiles_y = -(-height // tile_size)
+        self.tiles_x = -(-width // tile_size)
+        self.tile_count = self.tiles_y * self.tiles_x
+        self.skipped_tiles = 0
+
+        super().__init__(width, height, pattern, rule)
+
+    def clear(self):
+        super().clear()
+        # Nothing is known about the previous generation, so the first step
+        # has to look at every tile
+        self.changed_tiles: Set[Tuple[int, int]] = \
+            {(ty, tx) for ty in range(self.tiles_y) for tx in range(self.tiles_x)}
+
+    def set_cell(self, y: int, x: int, value: int):
+        super().set_cell(y, x, value)
+        self.changed_tiles.add((y // self.tile_size, x // self.tile_size))
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        super().load_arrays(ys, xs, top, left)
+        self.changed_tiles = {(ty, tx) for ty in range(self.tiles_y) for tx in range(self.tiles_x)}
+
+    def active_tiles(self) -> Set[Tuple[int, int]]:
+        """
+        active_tiles returns the changed tiles and their (wrapped) neighbours
+        """
+        active: Set[Tuple[int, int]] = set()
+        for ty, tx in self.changed_tiles:
+            for i in range(-1, 2):
+                for j in range(-1, 2):
+                    active.add(((ty + i) % self.tiles_y, (tx + j) % self.tiles_x))
+
+        return active
+
+    def game_step(self):
+        # The alive count is kept up to date per changed cell
+        self.calculate_new_map(self.next_gol_map)
+        self.gol_map, self.next_gol_map = self.next_gol_map, self.gol_map
+        self.generation += 1
+
+    def calculate_new_map(self, new_gol_map: Optional[List[List[int]]]=None) -> List[List[int]]:
+        """
+        calculate_new_map writes the active tiles of the next generation into
+        new_gol_map, which must hold the previous generation. A copy of the
+        current map is used when none is given
+        """
+        if new_gol_map is None:
+            new_gol_map = [row[:] for row in self.gol_map]
+
+        gol_map = self.gol_map
+        active = self.active_tiles()
+        changed_tiles: Set[Tuple[int, int]] = set()
+
+        for ty, tx in active:
+            y0 = ty * self.tile_size
+            y1 = min(y0 + self.tile_size, self.height)
+            x0 = tx * self.tile_size
+            x1 = min(x0 + self.tile_size, self.width)
+            self.calculate_region(new_gol_map, y0, y1, self.columns[x0:x1])
+
+            for y in range(y0, y1):
+                new_cells = new_gol_map[y][x0:x1]
+                cells = gol_map[y][x0:x1]
+                if new_cells != cells:
+                    self.alive += sum(new_cells) - sum(cells)
+                    changed_tiles.add((ty, tx))
+
+        self.changed_tiles = changed_tiles
+        self.skipped_tiles = self.tile_count - len(active)
+
+        return new_gol_map
+
+def numpy_next_rows(gol_map, y0: int, y1: int, table):
+    """
+    numpy_next_rows computes the next generation of rows y0 to y1 of
+    gol_map. It sums the eight shifted neighbour slices of a copy of the
+    rows padded with a one cell halo, which keeps the toroidal wraparound
+    of PythonLife.check_cell, and looks the result up in table, a numpy
+    version of Rule.table
+    """
+    h, w = gol_map.shape
+    rows = gol_map[np.arange(y0 - 1, y1 + 1) % h]
+    padded = np.pad(rows, ((0, 0), (1, 1)), mode="wrap")
+    stripe_h = y1 - y0
+
+    # Start with state * 9 so the sum is the index into the table
+    index = rows[1:-1] * np.uint8(9)
+    for i in range(3):
+        for j in range(3):
+            if i != 1 or j != 1:
+                index += padded[i:i + stripe_h, j:j + w]
+
+    return table[index]
+
+class NumpyLife(LifeEngine):
+    """
+    NumpyLife stores the board as a 2D uint8 array and computes a whole
+    generation at once.
+    """
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY):
+        if np is None:
+            raise ImportError("The numpy backend requires numpy to be installed")
+
+        super().__init__(width, height, pattern, rule)
+        self.table = np.array(self.rule.table, dtype=np.uint8)
+
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        self.gol_map = np.zeros((self.height, self.width), dtype=np.uint8)
+
+    def get_cell(self, y: int, x: int) -> int:
+        return int(self.gol_map[y, x])
+
+    def set_cell(self, y: int, x: int, value: int):
+        self.alive += value - int(self.gol_map[y, x])
+        self.gol_map[y, x] = value
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        ys = (np.asarray(ys, dtype=np.int64) + top) % self.height
+        xs = (np.asarray(xs, dtype=np.int64) + left) % self.width
+        self.gol_map[ys, xs] = 1
+        self.alive = int(np.count_nonzero(self.gol_map))
+
+    def to_list(self) -> List[List[int]]:
+        return self.gol_map.tolist()
+
+    def to_packed(self) -> bytes:
+        return np.packbits(self.gol_map, axis=1, bitorder="little").tobytes()
+
+    def load_packed(self, packed):
+        row_bytes = (self.width + 7) // 8
+        rows = np.frombuffer(packed, dtype=np.uint8, count=self.height * row_bytes)
+        self.gol_map[:] = np.unpackbits(rows.reshape(self.height, row_bytes), axis=1,
+                                        count=self.width, bitorder="little")
+        self.alive = int(np.count_nonzero(self.gol_map))
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        return set(zip(*(axis.tolist() for axis in np.nonzero(self.gol_map))))
+
+    def digest(self) -> bytes:
+        return hashlib.blake2b(np.packbits(self.gol_map).tobytes(), digest_size=16).digest()
+
+    def calculate_new_map(self):
+        new_gol_map = numpy_next_rows(self.gol_map, 0, self.height, self.table)
+        self.alive = int(np.count_nonzero(new_gol_map))
+
+        return new_gol_map
+
+    def game_step(self):
+        self.gol_map = self.calculate_new_map()
+        self.generation += 1
+
+def full_add(a: int, b: int, c: int) -> Tuple[int, int]:
+    """
+    full_add adds three bit vectors bitwise, returning the sum and carry
+    """
+    partial = a ^ b
+    return partial ^ c, (a & b) | (partial & c)
+
+class BitLife(LifeEngine):
+    """
+    BitLife packs every row into one Python int, one cell per bit with
+    bit x holding column x. A generation is computed with bit-sliced
+    full adders, so a single integer operation updates a whole row.
+    """
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        self.mask = (1 << self.width) - 1
+        self.rows: List[int] = [0] * self.height
+
+    def get_cell(self, y: int, x: int) -> int:
+        return (self.rows[y] >> x) & 1
+
+    def set_cell(self, y: int, x: int, value: int):
+        self.alive += value - self.get_cell(y, x)
+        if value:
+            self.rows[y] |= 1 << x
+        else:
+            self.rows[y] &= ~(1 << x)
+
+    def to_list(self) -> List[List[int]]:
+        return [[(row >> x) & 1 for x in range(self.width)] for row in self.rows]
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        cells = set()
+        for y, row in enumerate(self.rows):
+            while row:
+                # Lowest set bit first
+                x = (row & -row).bit_length() - 1
+                cells.add((y, x))
+                row &= row - 1
+
+        return cells
+
+    def digest(self) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        row_bytes = (self.width + 7) // 8
+        for row in self.rows:
+            digest.update(row.to_bytes(row_bytes, "little"))
+
+        return digest.digest()
+
+    def to_packed(self) -> bytes:
+        row_bytes = (self.width + 7) // 8
+        return b"".join(row.to_bytes(row_bytes, "little") for row in self.rows)
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        # Set the bits in the packed board, then convert every row once
+        w, h = self.width, self.height
+        row_bytes = (w + 7) // 8
+        if np is None:
+            packed = bytearray(self.to_packed())
+            for y, x in zip(ys, xs):
+                x = (left + x) % w
+                packed[((top + y) % h) * row_bytes + (x >> 3)] |= 1 << (x & 7)
+        else:
+            ys = (np.asarray(ys, dtype=np.int64) + top) % h
+            xs = (np.asarray(xs, dtype=np.int64) + left) % w
+            packed = np.frombuffer(self.to_packed(), dtype=np.uint8).copy()
+            np.bitwise_or.at(packed, ys * row_bytes + (xs >> 3),
+                             np.left_shift(1, xs & 7).astype(np.uint8))
+            packed = packed.tobytes()
+
+        self.load_packed(packed)
+
+    def load_packed(self, packed):
+        row_bytes = (self.width + 7) // 8
+        self.rows = [int.from_bytes(packed[y * row_bytes:(y + 1) * row_bytes], "little") & self.mask
+                     for y in range(self.height)]
+        self.alive = sum(row.bit_count() for row in self.rows)
+
+    def neighbour_counts(self) -> List[Tuple[int, int, int, int]]:
+        """
+        neighbour_counts returns the neighbour count of every cell as four
+        bit planes per row (weights 1, 2, 4 and 8)
+        """
+        w, mask = self.width, self.mask
+        rows = self.rows
+        h = len(rows)
+
+        # Horizontal sums: three cells wide for the rows above and below,
+        # two cells (without the center) for the row itself
+        triples = []
+        pairs = []
+        for row in rows:
+            west = ((row << 1) | (row >> (w - 1))) & mask
+            east = (row >> 1) | ((row & 1) << (w - 1))
+            triples.append(full_add(west, row, east))
+            pairs.append((west ^ east, west & east))
+
+        counts = []
+        for y in range(h):
+            above0, above1 = triples[(y - 1) % h]
+            below0, below1 = triples[(y + 1) % h]
+            pair0, pair1 = pairs[y]
+
+            bit0, carry = full_add(above0, below0, pair0)
+            twos, fours_a = full_add(above1, below1, pair1)
+            bit1 = twos ^ carry
+            fours_b = twos & carry
+
+            counts.append((bit0, bit1, fours_a ^ fours_b, fours_a & fours_b))
+
+        return counts
+
+    def count_mask(self, bits: Tuple[int, int, int, int], count: int) -> int:
+        """
+        count_mask returns the cells of a row with exactly count neighbours
+        """
+        result = self.mask
+        for i, plane in enumerate(bits):
+            result &= plane if (count >> i) & 1 else ~plane
+
+        return result
+
+    def game_step(self):
+        new_rows = []
+        if self.rule.is_conway:
+            for row, (bit0, bit1, bit2, bit3) in zip(self.rows, self.neighbour_counts()):
+                # Two or three neighbours, birth needs the ones bit as well
+                new_rows.append(bit1 & ~(bit2 | bit3) & (bit0 | row))
+        else:
+            birth, survival = self.rule.birth, self.rule.survival
+            for row, bits in zip(self.rows, self.neighbour_counts()):
+                born = survive = 0
+                for count in birth | survival:
+                    cells = self.count_mask(bits, count)
+                    if count in birth:
+                        born |= cells
+                    if count in survival:
+                        survive |= cells
+
+                new_rows.append((born & ~row & self.mask) | (survive & row))
+
+        self.rows = new_rows
+        self.alive = sum(row.bit_count() for row in new_rows)
+        self.generation += 1
+
+class SparseLife(LifeEngine):
+    """
+    SparseLife only stores the live cells, packed as y * width + x into a
+    set. A generation is computed from the neighbour counts of the live
+    cells, so its cost scales with the population instead of the area.
+    Rules with birth on 0 neighbours are not supported.
+    """
+    supports_b0 = False
+
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY):
+        if 0 in to_rule(rule).birth:
+            raise ValueError("The sparse backend does not support rules with B0")
+
+        super().__init__(width, height, pattern, rule)
+
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        self.cells: Set[int] = set()
+
+    def get_cell(self, y: int, x: int) -> int:
+        return 1 if y * self.width + x in self.cells else 0
+
+    def set_cell(self, y: int, x: int, value: int):
+        if value:
+            self.cells.add(y * self.width + x)
+        else:
+            self.cells.discard(y * self.width + x)
+
+        self.alive = len(self.cells)
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        w, h = self.width, self.height
+        self.cells.update(((top + y) % h) * w + (left + x) % w for y, x in zip(ys, xs))
+        self.alive = len(self.cells)
+
+    def to_list(self) -> List[List[int]]:
+        gol_map = [[0 for x in range(self.width)] for y in range(self.height)]
+        for cell in self.cells:
+            y, x = divmod(cell, self.width)
+            gol_map[y][x] = 1
+
+        return gol_map
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        return {divmod(cell, self.width) for cell in self.cells}
+
+    def to_packed(self) -> bytes:
+        if np is None:
+            return super().to_packed()
+
+        board = np.zeros(self.height * self.width, dtype=np.uint8)
+        board[np.fromiter(self.cells, dtype=np.int64, count=len(self.cells))] = 1
+        return np.packbits(board.reshape(self.height, self.width), axis=1,
+                           bitorder="little").tobytes()
+
+    def digest(self) -> bytes:
+        return hashlib.blake2b(array("q", sorted(self.cells)).tobytes(), digest_size=16).digest()
+
+    def neighbours(self) -> List[int]:
+        """
+        neighbours returns the packed neighbour coordinates of every live
+        cell, each coordinate appears once per live neighbour it has
+        """
+        w, h = self.width, self.height
+        result: List[int] = []
+
+        for cell in self.cells:
+            y, x = divmod(cell, w)
+            above = ((y - 1) % h) * w
+            row = y * w
+            below = ((y + 1) % h) * w
+            left = (x - 1) % w
+            right = (x + 1) % w
+
+            result += (above + left, above + x, above + right,
+                       row + left, row + right,
+                       below + left, below + x, below + right)
+
+        return result
+
+    def game_step(self):
+        cells = self.cells
+        table = self.rule.table
+        counts = Counter(self.neighbours())
+        self.cells = {cell for cell, sum_neighbours in counts.items()
+                      if table[(cell in cells) * 9 + sum_neighbours]}
+
+        # Live cells without any live neighbour do not show up in counts
+        if 0 in self.rule.survival:
+            self.cells |= {cell for cell in cells if cell not in counts}
+
+        self.alive = len(self.cells)
+        self.generation += 1
+
+# Available stepping engines, "numpy" requires numpy to be installed
+ENGINES = {
+    "python": PythonLife,
+    "numpy": NumpyLife,
+    "sparse": SparseLife,
+    "tiled": TiledLife,
+    "bitpacked": BitLife,
+}
+
+# Engines that live in their own module, imported on first use
+EXTERNAL_ENGINES = {
+    "hashlife": ("hashlife", "HashLife"),
+    "parallel": ("parallel", "ParallelLife"),
+    "memmap": ("memmap", "MemmapLife"),
+}
+BACKENDS = tuple(ENGINES) + tuple(EXTERNAL_ENGINES)
+
+def create_engine(backend: str, width: int, height: int,
+                  pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                  rule: Union[str, Rule]=CONWAY, **options) -> LifeEngine:
+    """
+    create_engine returns a new engine of the given backend, options are
+    passed on to the engine (e.g. tile_size for "tiled")
+    """
+    return engine_class(backend)(width, height, pattern, rule, **options)
+
+def engine_class(backend: str) -> type:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+    if backend in EXTERNAL_ENGINES:
+        module, name = EXTERNAL_ENGINES[backend]
+        return getattr(importlib.import_module(module), name)
+
+    return ENGINES[backend]
+
+def check_rule(backend: str, rule: Union[str, Rule]):
+    """
+    check_rule raises a ValueError if the backend cannot run rule, without
+    creating an engine
+    """
+    if 0 in to_rule(rule).birth and not engine_class(backend).supports_b0:
+        raise ValueError(f"The {backend} backend does not support rules with B0")
@@ -5,43 +5,115 @@ Originally written by Tristan Ropers in 2013,
 refactored almost 11 years later in 2024.
 """
 
-import random
-import time
+import argparse
 import math
 import signal
 import sys
 from curses import *
-from typing import List
-
-# Delay used inbetween updates for game loop
-DELAY = .05
-
-MIN_RAND_CELLS = 3
-MAX_RAND_CELLS = 1000
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+from ages import MAX_AGE, CellAges
+from checkpoint import DEFAULT_KEEP, Checkpointer
+from config import RunConfig
+from cycles import Cycle, CycleDetector
+from engine import BACKENDS, LifeEngine, check_rule
+from history import History
+from patterns import Pattern, place_pattern
+from rules import to_rule
+from scheduler import DEFAULT_FPS, DEFAULT_SPEED, Scheduler
+from snapshot import COMPRESSIONS, Snapshot, read_snapshot, save_snapshot
 
 # Used to determine how big the game field can be in size
 MAX_INFO_STR_LEN = 56
 
+# How live cells are coloured: "noise" draws them bold or normal by a fixed
+# random pattern over the game field, "plain" draws them all alike and
+# "age" colours them by age
+CELL_ATTRIBUTE_MODES = ("noise", "plain", "age")
+
+# Colour pair of live cells from the given age on, used by the "age" mode
+AGE_COLOUR_PAIRS = ((1, 5), (2, 1), (4, 2), (8, 4), (16, 3), (64, 6))
+
+# How the game field is drawn: "rows" draws every row with one addstr per
+# run of cells sharing an attribute, "cells" moves to and draws every cell
+RENDERERS = ("rows", "cells")
+
+# Unchanged cells in between changed ones that are redrawn rather than
+# starting a new addstr
+REDRAW_GAP = 4
+
+# Length of the precomputed shimmer table, a prime so that its pattern
+# does not line up with the rows of the game field
+NOISE_TABLE_SIZE = 4093
+
 class GameOfLife():
     """
     GameOfLife implements John Conway's Game of Life in Python using
-    the curses library.
+    the curses library. It is a thin frontend, the simulation itself
+    is done by a LifeEngine from engine.py, set up as described by config.
     """
-    def __init__(self, screen_offset: int=1):
-        self.alive = 0
-        self.generation = 0
+    def __init__(self, screen_offset: int=1, stdscr=None, config: Optional[RunConfig]=None,
+                 cell_attributes: str="noise", renderer: str="rows", history: bool=True):
+        if cell_attributes not in CELL_ATTRIBUTE_MODES:
+            raise ValueError(f"Unknown cell attribute mode '{cell_attributes}', "
+                             f"expected one of {CELL_ATTRIBUTE_MODES}")
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer '{renderer}', expected one of {RENDERERS}")
+
         self.max_x = 0
         self.max_y = 0
         self.screen_offset = screen_offset
         self.screen_buffer_offset = 10
 
+        self.config = config if config is not None else RunConfig()
+        self.map_rng = self.config.rng("map")
+        self.cell_attributes = cell_attributes
+        self.renderer = renderer
+
         self.cur_x = 0
         self.cur_y = 0
 
-        self.init_screen()
+        # What is currently on the screen, used to only redraw changes
+        self.drawn_map: Optional[List[List[int]]] = None
+        self.drawn_game_data: Optional[Tuple[int, int, Optional[Cycle]]] = None
+
+        self.init_screen(stdscr)
+        self.fit_board()
 
-        self.gol_map: List[List[int]] = \
-            [[0 for x in range(self.max_x)] for y in range(self.max_y)]
+        # Shimmer of the live cells, looked up by position only: unchanged
+        # cells are not redrawn, so it could not move between generations
+        draw_rng = self.config.rng("draw")
+        self.noise = [self.text_attr if draw_rng.getrandbits(1) else self.cell_attr
+                      for _ in range(NOISE_TABLE_SIZE)]
+
+        # Age band of every age, 0 for dead cells
+        self.age_bands = [0] + [sum(1 for min_age, _ in AGE_COLOUR_PAIRS if age >= min_age)
+                                for age in range(1, MAX_AGE + 1)]
+
+        # Holds the pattern of the config or its first random map
+        self.engine: LifeEngine = self.config.create_engine()
+        self.history = History(self.engine) if history else None
+        self.restart_history()
+        self.cycles = CycleDetector(self.engine)
+        self.cycles.observe()
+        self.ages = CellAges(self.engine) if cell_attributes == "age" else None
+
+    @property
+    def gol_map(self):
+        return self.engine.gol_map
+
+    @property
+    def alive(self) -> int:
+        return self.engine.alive
+
+    @property
+    def generation(self) -> int:
+        return self.engine.generation
+
+    @property
+    def cycle(self) -> Optional[Cycle]:
+        return self.cycles.cycle
 
     def nodelay(self, on_off: bool):
         if on_off:
@@ -93,23 +165,34 @@ class GameOfLife():
         elif ch == ord('l'):
             self.move_cursor_by(0, int(num))
 
-    def init_screen(self):
+    def init_screen(self, stdscr=None):
         """
-        init_screen initializes the curses environment
+        init_screen initializes the curses environment. When a screen is
+        passed in (e.g. a fake screen for benchmarks) curses is left alone
+        and no colours are used
         """
 
-        self.stdscr = initscr()
-        self.stdscr.keypad(True)
-        start_color()
-        init_pair(1, COLOR_GREEN, COLOR_BLACK)
-        init_pair(2, COLOR_CYAN, COLOR_BLACK)
-        init_pair(3, COLOR_MAGENTA, COLOR_BLACK)
-        init_pair(4, COLOR_BLUE, COLOR_BLACK)
-        init_pair(5, COLOR_YELLOW, COLOR_BLACK)
-        init_pair(6, COLOR_RED, COLOR_BLACK)
-        init_pair(7, COLOR_CYAN, COLOR_CYAN)
-        self.stdscr.attrset(color_pair(1) + A_BOLD)
-        noecho()
+        if stdscr is None:
+            self.stdscr = initscr()
+            self.stdscr.keypad(True)
+            start_color()
+            init_pair(1, COLOR_GREEN, COLOR_BLACK)
+            init_pair(2, COLOR_CYAN, COLOR_BLACK)
+            init_pair(3, COLOR_MAGENTA, COLOR_BLACK)
+            init_pair(4, COLOR_BLUE, COLOR_BLACK)
+            init_pair(5, COLOR_YELLOW, COLOR_BLACK)
+            init_pair(6, COLOR_RED, COLOR_BLACK)
+            init_pair(7, COLOR_CYAN, COLOR_CYAN)
+            noecho()
+            self.cell_attr = color_pair(1)
+            self.band_attrs = [0] + [color_pair(pair) for _, pair in AGE_COLOUR_PAIRS]
+        else:
+            self.stdscr = stdscr
+            self.cell_attr = 0
+            self.band_attrs = [0] * (len(AGE_COLOUR_PAIRS) + 1)
+
+        self.text_attr = self.cell_attr + A_BOLD
+        self.stdscr.attrset(self.text_attr)
 
         self.max_y, self.max_x = self.stdscr.getmaxyx()
         self.max_y -= self.screen_buffer_offset
@@ -118,34 +201,97 @@ class GameOfLife():
         self.cur_x = math.floor(self.max_x / 2)
         self.cur_y = math.floor(self.max_y / 2)
 
-    def clear_map(self):
-        self.generation = 0
-        self.alive = 0
+    def fit_board(self):
+        """
+        fit_board sizes the board as configured, or to the game field where
+        the config leaves the size out. The config is updated to the size
+        used.
+        """
+        config = self.config
+        if config.width is None:
+            config.width = self.max_x
+        if config.height is None:
+            config.height = self.max_y
+        if config.width > self.max_x or config.height > self.max_y:
+            raise ValueError(f"A {config.width}x{config.height} board does not fit the "
+                             f"{self.max_x}x{self.max_y} game field")
+
+        self.max_x, self.max_y = config.width, config.height
+        self.cur_x = math.floor(self.max_x / 2)
+        self.cur_y = math.floor(self.max_y / 2)
 
-        self.gol_map: List[List[int]] = \
-            [[0 for x in range(self.max_x)] for y in range(self.max_y)]
+    def clear_map(self):
+        self.engine.clear()
+        self.restart_history()
+        self.board_edited()
 
     def generate_random_map(self):
-        self.clear_map()
-        rand = random.randint(MIN_RAND_CELLS, MAX_RAND_CELLS)
-        fail_count = 0
-        self.generation = 0
-
-        for _ in range(rand):
-            cell_set = False
-
-            x = random.randint(0, self.max_x - 1)
-            y = random.randint(0, self.max_y - 1)
-
-            while not cell_set and fail_count < self.max_x * self.max_y:
-                if self.gol_map[y][x] < 1:
-                    self.alive += 1
-                    self.gol_map[y][x] = 1
-                    cell_set = True
-                else:
-                    x = random.randint(0, self.max_x - 1)
-                    y = random.randint(0, self.max_y - 1)
-                    fail_count += 1
+        self.engine.generate_random_map(self.config.density, self.map_rng.getrandbits(64))
+        self.restart_history()
+        self.board_edited()
+
+    def load_pattern(self, pattern: Pattern):
+        """
+        load_pattern replaces the board with pattern, centered on the game
+        field
+        """
+        self.engine.clear()
+        place_pattern(self.engine, pattern)
+        self.restart_history()
+        self.board_edited()
+
+    def save_snapshot(self, path: str, compression: str="none"):
+        save_snapshot(path, self.engine, (self.cur_y, self.cur_x), compression)
+
+    def load_snapshot(self, snapshot: Snapshot):
+        """
+        load_snapshot resumes the board and cursor of snapshot. A snapshot
+        of another board size is centered on the game field instead
+        """
+        if (snapshot.width, snapshot.height) == (self.max_x, self.max_y):
+            snapshot.restore(self.engine)
+            self.cur_y, self.cur_x = snapshot.cursor
+        else:
+            self.engine.clear()
+            place_pattern(self.engine, snapshot.to_pattern())
+            self.engine.generation = snapshot.generation
+
+        self.restart_history()
+        self.board_edited()
+
+    def close(self):
+        """
+        close removes the spilled history and releases the engine, e.g. the
+        board file of memmap or the process pool of parallel
+        """
+        if self.history is not None:
+            self.history.close()
+        if hasattr(self.engine, "close"):
+            self.engine.close()
+
+    def restart_history(self):
+        """
+        restart_history starts a new history from the current board
+        """
+        if self.history is not None:
+            self.history.clear()
+            self.history.record()
+
+    def board_edited(self, cell: Optional[Tuple[int, int]]=None):
+        """
+        board_edited restarts cycle detection and cell ages from the current
+        board on, needed whenever the board changed by other means than a step.
+        When only the cell at cell = (y, x) was edited, only its age restarts.
+        """
+        self.cycles.reset()
+        self.cycles.observe()
+        if self.ages is None:
+            return
+
+        if cell is None:
+            self.ages.reset()
+        else:
+            self.ages.restart_cell(*cell)
 
     def print_key_hints(self):
         self.stdscr.move(self.max_y + 2, self.screen_offset)
@@ -191,6 +337,7 @@ class GameOfLife():
             com = self.stdscr.getch()
 
         self.stdscr.clear()
+        self.invalidate_screen()
 
     def game_setup(self):
         self.stdscr.addstr("Random? (y/n)")
@@ -203,80 +350,151 @@ class GameOfLife():
             choice = self.stdscr.getch()
 
         self.stdscr.clear()
+        self.invalidate_screen()
 
         if choice == ord('y'):
             self.generate_random_map()
         elif choice == ord('n'):
+            self.clear_map()
             self.map_drawer_loop()
 
     def draw_cell(self, y: int, x: int):
         self.stdscr.move(y + self.screen_offset, x + self.screen_offset)
-        if self.gol_map[y][x] == 0:
+        if self.engine.get_cell(y, x) == 0:
             self.stdscr.addstr('.')
         else:
-            if random.randint(0, 1) == 1:
-                colpair = color_pair(1) + A_BOLD
-            else:
-                colpair = color_pair(1)
-
-            self.draw_symbol(y, x, '@', colpair)
+            band = self.age_bands[self.ages.get_age(y, x)] if self.ages is not None else 1
+            self.draw_symbol(y, x, '@', self.live_cell_attr(y, x, band))
 
-    def draw_map(self):
-        for x in range(self.max_x):
-            for y in range(self.max_y):
-                self.draw_cell(y, x)
+    def live_cell_attr(self, y: int, x: int, band: int) -> int:
+        """
+        live_cell_attr returns the attribute of the live cell at y, x, band
+        is its age band when colouring by age
+        """
+        if self.cell_attributes == "noise":
+            return self.noise[(y * self.max_x + x) % NOISE_TABLE_SIZE]
+        if self.cell_attributes == "age":
+            return self.band_attrs[band]
 
-    def toggle_cell_at_cursor(self):
-        res = 1 - self.gol_map[self.cur_y][self.cur_x]
-        self.gol_map[self.cur_y][self.cur_x] = res
+        return self.cell_attr
 
-        if res > 0:
-            self.alive += 1
+    def draw_row(self, y: int, row: List[int], x0: int, x1: int):
+        """
+        draw_row draws cells x0 to x1 of row, which holds the cell states
+        (or age bands) of line y, with one addstr per run of cells sharing
+        an attribute
+        """
+        cells = row[x0:x1]
+        symbols = "".join(['@' if cell else '.' for cell in cells])
+        text_attr = self.text_attr
+
+        # Same as live_cell_attr, inlined for the common modes
+        if self.cell_attributes == "noise":
+            noise = self.noise
+            base = y * self.max_x
+            attrs = [noise[(base + x) % NOISE_TABLE_SIZE] if cell else text_attr
+                     for x, cell in enumerate(cells, x0)]
+        elif self.cell_attributes == "age":
+            band_attrs = self.band_attrs
+            attrs = [band_attrs[cell] if cell else text_attr for cell in cells]
         else:
-            self.alive -= 1
-
-    def check_cell(self, x: int, y: int, new_gol_map: List[List[int]]):
-        sum_neighbours = 0
-
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                row = (y + i) % self.max_y
-                column = (x + j) % self.max_x
+            attrs = [self.cell_attr if cell else text_attr for cell in cells]
 
-                sum_neighbours += self.gol_map[row][column]
+        start = 0
+        for attr, run in groupby(attrs):
+            end = start + len(list(run))
+            self.stdscr.addstr(y + self.screen_offset, x0 + start + self.screen_offset,
+                               symbols[start:end], attr)
+            start = end
 
-        sum_neighbours -= self.gol_map[y][x]
+    def invalidate_screen(self):
+        """
+        invalidate_screen forgets what was drawn, so that the next frame
+        redraws everything, needed after the screen was cleared
+        """
+        self.drawn_map = None
+        self.drawn_game_data = None
 
-        if self.gol_map[y][x] == 1:
-            if sum_neighbours < 2 or sum_neighbours > 3:
-                new_gol_map[y][x] = 0
-                self.alive -= 1
-            elif 2 <= sum_neighbours <= 3:
-                new_gol_map[y][x] = 1
+    def draw_map(self):
+        """
+        draw_map only redraws the cells that flipped since the last frame,
+        or that moved to another age band when colouring by age. The rows
+        renderer redraws runs of changed cells, including short gaps of
+        unchanged cells in between.
+        """
+        if self.ages is not None:
+            gol_map = self.ages.lookup(self.age_bands)
         else:
-            if sum_neighbours == 3:
-                new_gol_map[y][x] = 1
-                self.alive += 1
+            gol_map = self.engine.to_list()
+
+        if self.renderer == "rows":
+            for y, row in enumerate(gol_map):
+                if self.drawn_map is None:
+                    self.draw_row(y, row, 0, self.max_x)
+                elif row != self.drawn_map[y]:
+                    drawn_row = self.drawn_map[y]
+                    changed = [x for x in range(self.max_x) if row[x] != drawn_row[x]]
+
+                    # Changed cells close to each other are drawn together
+                    start = changed[0]
+                    for previous, x in zip(changed, changed[1:]):
+                        if x - previous > REDRAW_GAP:
+                            self.draw_row(y, row, start, previous + 1)
+                            start = x
+                    self.draw_row(y, row, start, changed[-1] + 1)
+        elif self.drawn_map is None:
+            for x in range(self.max_x):
+                for y in range(self.max_y):
+                    self.draw_cell(y, x)
+        else:
+            for y, (row, drawn_row) in enumerate(zip(gol_map, self.drawn_map)):
+                if row != drawn_row:
+                    for x in range(self.max_x):
+                        if row[x] != drawn_row[x]:
+                            self.draw_cell(y, x)
 
-    def calculate_new_map(self) -> List[List[int]]:
-        # new_gol_map = copy.deepcopy(self.gol_map)
-        new_gol_map: List[List[int]] = \
-            [[0 for x in range(self.max_x)] for y in range(self.max_y)]
+        self.drawn_map = gol_map
 
-        for x in range(self.max_x):
-            for y in range(self.max_y):
-                self.check_cell(x, y, new_gol_map)
+    def toggle_cell_at_cursor(self):
+        self.engine.toggle_cell(self.cur_y, self.cur_x)
+        if self.history is not None:
+            self.history.record()
+        self.board_edited((self.cur_y, self.cur_x))
 
-        return new_gol_map
+    def print_game_data(self, speed: Optional[float]=None):
+        """
+        print_game_data prints generation, alive count, the measured speed in
+        generations per second and a detected cycle when they changed, the
+        help text is only printed after the screen was invalidated
+        """
+        speed = None if speed is None else round(speed)
+        game_data = (self.generation, self.alive, self.cycle, speed)
+        if game_data == self.drawn_game_data:
+            return
 
-    def print_game_data(self):
-        self.stdscr.attrset(color_pair(1) + A_BOLD)
+        self.stdscr.attrset(self.text_attr)
         self.stdscr.move(self.max_y + 2, self.screen_offset)
         self.stdscr.addstr(f"Generation: {self.generation}      ")
         self.stdscr.move(self.max_y + 2, self.screen_offset + 30)
         self.stdscr.addstr("           ")
         self.stdscr.move(self.max_y + 2, self.screen_offset + 30)
         self.stdscr.addstr(f"Alive: {self.alive}")
+        if speed is not None:
+            self.stdscr.move(self.max_y + 2, self.screen_offset + 50)
+            self.stdscr.addstr(f"{speed} gen/s".ljust(16))
+        self.stdscr.move(self.max_y + 3, self.screen_offset)
+        if self.cycle is None:
+            self.stdscr.addstr(" " * 50)
+        elif self.cycle.period == 1:
+            self.stdscr.addstr(f"Still life from generation {self.cycle.start}".ljust(50))
+        else:
+            self.stdscr.addstr(f"Cycle: period {self.cycle.period} from generation "
+                               f"{self.cycle.start}".ljust(50))
+
+        first_draw = self.drawn_game_data is None
+        self.drawn_game_data = game_data
+        if not first_draw:
+            return
 
         self.stdscr.move(int(self.max_y / 2), self.max_x + self.screen_offset + 1)
         self.stdscr.addstr("GAME OF LIFE in Python      ")
@@ -296,27 +514,67 @@ class GameOfLife():
         self.stdscr.addstr("SPACE - Toggles cell at cursor position")
         self.stdscr.move(int(self.max_y / 2) + 8, self.max_x + self.screen_offset + 1)
         self.stdscr.addstr("p / ENTER - Pause the game")
+        self.stdscr.move(int(self.max_y / 2) + 9, self.max_x + self.screen_offset + 1)
+        self.stdscr.addstr("< / > - Step back / forward through the history")
+        self.stdscr.move(int(self.max_y / 2) + 10, self.max_x + self.screen_offset + 1)
+        self.stdscr.addstr("w - Write a snapshot of the game field")
 
-    def game_draw(self):
+    def game_draw(self, speed: Optional[float]=None):
         self.draw_map()
-        self.print_game_data()
+        self.print_game_data(speed)
 
         # Move cursor to last position
         self.stdscr.move(self.cur_y + self.screen_offset, self.cur_x + self.screen_offset)
         self.stdscr.refresh()
 
     def game_step(self):
-        self.gol_map = self.calculate_new_map()
-        self.generation += 1
+        self.engine.game_step()
+        if self.history is not None:
+            self.history.record()
+        self.cycles.observe()
+        if self.ages is not None:
+            self.ages.update()
+
+    def step_history(self, offset: int):
+        """
+        step_history moves offset generations through the recorded history,
+        stepping forward past its end computes new generations. Without a
+        history only stepping forward is possible.
+        """
+        target = self.generation + offset
+        if self.history is None:
+            first_generation = last_generation = self.generation
+        else:
+            first_generation = self.history.first_generation
+            last_generation = self.history.last_generation
+        if target < first_generation:
+            return
+
+        if target <= last_generation:
+            self.history.restore(target)
+            self.board_edited()
+        else:
+            for _ in range(target - self.generation):
+                self.game_step()
 
 def signal_handler(sig, frame):
     """
-    signal_handler handles CTRL-C to gracefully exit curses
+    signal_handler handles CTRL-C to gracefully exit curses, the main
+    loop cleans up on the way out
     """
-    endwin()
     sys.exit(0)
 
-def fetch_input(gol: GameOfLife, running: bool, is_paused: bool) -> (bool, bool):
+def end_screen():
+    """
+    end_screen restores the terminal, if curses was started at all
+    """
+    try:
+        endwin()
+    except error:
+        pass
+
+def fetch_input(gol: GameOfLife, running: bool, is_paused: bool,
+                snapshot_path: str="gol.snap", compression: str="none") -> (bool, bool):
     if not is_paused:
         gol.nodelay(True)
 
@@ -349,8 +607,16 @@ def fetch_input(gol: GameOfLife, running: bool, is_paused: bool) -> (bool, bool)
             gol.move_multiple(ch)
         elif ch == ord('p') or ch == ord('\n'):
             is_paused = not is_paused
+        elif ch == ord('<') or ch == ord(','):
+            gol.step_history(-1)
+            is_paused = True
+        elif ch == ord('>') or ch == ord('.'):
+            gol.step_history(1)
+            is_paused = True
         elif ch == ord(' '):
             gol.toggle_cell_at_cursor()
+        elif ch == ord('w'):
+            gol.save_snapshot(snapshot_path, compression)
 
     gol.nodelay(False)
     return running, is_paused
@@ -359,18 +625,122 @@ if __name__ == "__main__":
     # Setup CTRL-C handler
     signal.signal(signal.SIGINT, signal_handler)
 
-    gol = GameOfLife()
-    gol.game_setup()
-
-    running = True
-    is_paused = False
-
-    while running:
-        gol.game_draw()
-        running, is_paused = fetch_input(gol, running, is_paused)
-
-        if not is_paused:
-            time.sleep(DELAY)
-            gol.game_step()
-
-    endwin()
+    parser = argparse.ArgumentParser(description="John Conway's Game of Life")
+    parser.add_argument("--backend", choices=BACKENDS, default="python",
+                        help="stepping engine used to calculate new generations")
+    parser.add_argument("--rule", type=to_rule,
+                        help="Life-like rule in B/S notation (e.g. B36/S23) or its name, "
+                        "defaults to the rule of the pattern or B3/S23")
+    parser.add_argument("--seed", type=int,
+                        help="seed of random maps, makes runs reproducible")
+    parser.add_argument("--density", type=float,
+                        help="fraction of live cells in random maps (e.g. 0.3)")
+    parser.add_argument("--pattern",
+                        help="pattern file to start with (.rle, .cells or Life 1.06)")
+    parser.add_argument("--snapshot", default="gol.snap",
+                        help="snapshot file written with w and read with --resume")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none",
+                        help="compression of written snapshots")
+    parser.add_argument("--resume", action="store_true",
+                        help="start from the snapshot file instead of a new game field")
+    parser.add_argument("--checkpoint-dir",
+                        help="directory to write checkpoints to while the game runs")
+    parser.add_argument("--checkpoint-every", type=int,
+                        help="generations between checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float,
+                        help="seconds between checkpoints")
+    parser.add_argument("--checkpoint-keep", type=int, default=DEFAULT_KEEP,
+                        help="number of checkpoints kept")
+    parser.add_argument("--cell-attributes", choices=CELL_ATTRIBUTE_MODES, default="noise",
+                        help="how live cells are coloured")
+    parser.add_argument("--renderer", choices=RENDERERS, default="rows",
+                        help="how the game field is drawn")
+    parser.add_argument("--no-history", dest="history", action="store_false",
+                        help="do not record the history stepped through with < and >")
+    parser.add_argument("--stop-on-cycle", action="store_true",
+                        help="pause once the board became a still life or started to oscillate")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED,
+                        help="generations per second, 0 runs as fast as possible")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS,
+                        help="frames drawn per second at most, generations in between are "
+                        "not drawn")
+    args = parser.parse_args()
+    if args.checkpoint_dir and args.checkpoint_every is None and args.checkpoint_seconds is None:
+        parser.error("--checkpoint-dir requires --checkpoint-every or --checkpoint-seconds")
+    if args.speed < 0 or args.fps <= 0:
+        parser.error("--speed must not be negative and --fps must be positive")
+
+    config = RunConfig(args.backend, args.rule, seed=args.seed, density=args.density,
+                       pattern=args.pattern)
+    # Read the pattern before curses takes over the terminal, so errors show
+    config.read_pattern()
+    snapshot = read_snapshot(args.snapshot) if args.resume else None
+    if snapshot is not None and config.rule is None:
+        config.rule = snapshot.rule
+    try:
+        check_rule(config.backend, config.effective_rule())
+    except ValueError as e:
+        parser.error(str(e))
+
+    gol = None
+    checkpointer = None
+    try:
+        # Created in here, the engine may fail after curses took the terminal
+        gol = GameOfLife(config=config, cell_attributes=args.cell_attributes,
+                         renderer=args.renderer, history=args.history)
+        # A pattern of the config is already on the board
+        if snapshot is not None:
+            gol.load_snapshot(snapshot)
+            snapshot.close()
+        elif config.pattern is None:
+            gol.game_setup()
+
+        if args.checkpoint_dir:
+            checkpointer = Checkpointer(gol.engine, args.checkpoint_dir, args.checkpoint_every,
+                                        args.checkpoint_seconds, args.checkpoint_keep,
+                                        args.compression)
+
+        scheduler = Scheduler(args.speed, args.fps)
+        running = True
+        is_paused = False
+
+        while running:
+            gol.game_draw(0 if is_paused else scheduler.generations_per_second)
+            scheduler.frame_drawn()
+            was_paused = is_paused
+            running, is_paused = fetch_input(gol, running, is_paused, args.snapshot,
+                                             args.compression)
+            if is_paused:
+                continue
+            if was_paused:
+                scheduler.resume()
+
+            # Step until the next frame is due, only the last generation is drawn
+            while not scheduler.frame_due():
+                if not scheduler.step_due():
+                    scheduler.wait()
+                    continue
+
+                gol.game_step()
+                scheduler.stepped()
+                if checkpointer is not None:
+                    checkpointer.maybe_checkpoint((gol.cur_y, gol.cur_x))
+
+                # Pause once, on the generation the cycle is detected
+                cycle = gol.cycle
+                if args.stop_on_cycle and cycle is not None \
+                        and gol.generation == cycle.start + cycle.period:
+                    is_paused = True
+                    break
+    finally:
+        try:
+            if checkpointer is not None:
+                checkpointer.close()
+        finally:
+            if gol is not None:
+                gol.close()
+            end_screen()
+
+    if checkpointer is not None and checkpointer.failed:
+        print(f"{checkpointer.failed} checkpoint(s) could not be written, last error: "
+              f"{checkpointer.error}", file=sys.stderr)
@@ -0,0 +1,439 @@
+"""
+hashlife.py
+
+HashLife engine. The board is a quadtree of canonicalised nodes, so equal
+regions are stored only once, and the result of advancing a node is
+memoised on the node. This lets step(n) jump 2^k generations in one call.
+"""
+
+import hashlib
+import itertools
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from engine import LifeEngine, np
+from rules import CONWAY, Rule, to_rule
+
+# Default memory budget of the node cache in bytes
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Size of a node in bytes, used to turn the memory budget into a node
+# count. Measured with tracemalloc on soups (550 to 650 bytes): the node
+# itself, its key tuple and slot in the canonical table and, for about
+# half of the nodes, the dict of memoised results.
+NODE_SIZE = 600
+
+# The cache is never shrunk below this many nodes
+MIN_CACHE_NODES = 1024
+
+class Node():
+    """
+    Node is a square of 2^level x 2^level cells. Level 0 nodes are single
+    cells, every other node consists of four children of level - 1.
+    """
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population", "result")
+
+    def __init__(self, nw: Optional["Node"], ne: Optional["Node"],
+                 sw: Optional["Node"], se: Optional["Node"],
+                 level: int, population: int):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+        self.result: Optional[Dict[int, "Node"]] = None
+
+DEAD = Node(None, None, None, None, 0, 0)
+ALIVE = Node(None, None, None, None, 0, 1)
+
+class HashLife(LifeEngine):
+    """
+    HashLife simulates the unbounded plane, width and height only describe
+    the region that is read with get_cell and to_list. Unlike the other
+    engines patterns do not wrap around the edges of the board, so results
+    only match them until a pattern reaches the border. Rules with birth on
+    0 neighbours are not supported, they would fill the whole plane.
+
+    memory_budget bounds the node cache in bytes. When it is exceeded after
+    a step, every node not reachable from the current board is evicted and
+    all memoised results are dropped, so the next steps recompute them. A
+    single large step may temporarily exceed the budget. If the board
+    alone takes more nodes than the budget allows, this happens after
+    every step, so the budget should leave room for the results.
+    """
+    supports_b0 = False
+
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY, memory_budget: int=DEFAULT_MEMORY_BUDGET):
+        if 0 in to_rule(rule).birth:
+            raise ValueError("The hashlife backend does not support rules with B0")
+
+        self.max_nodes = max(memory_budget // NODE_SIZE, MIN_CACHE_NODES)
+        self.collections = 0
+
+        super().__init__(width, height, pattern, rule)
+
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        self.table: Dict[Tuple[int, int, int, int], Node] = {}
+        self.empty_nodes: List[Node] = [DEAD]
+
+        # The root is centered on the origin and must cover the board
+        level = 3
+        while (1 << (level - 1)) < max(self.width, self.height):
+            level += 1
+        self.root = self.empty(level)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.table)
+
+    def join(self, nw: Node, ne: Node, sw: Node, se: Node) -> Node:
+        """
+        join returns the canonical node with the given children
+        """
+        key = (id(nw), id(ne), id(sw), id(se))
+        node = self.table.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.table[key] = node
+
+        return node
+
+    def empty(self, level: int) -> Node:
+        while len(self.empty_nodes) <= level:
+            e = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(e, e, e, e))
+
+        return self.empty_nodes[level]
+
+    def expand(self, node: Node) -> Node:
+        """
+        expand returns a node one level up with node in its center
+        """
+        e = self.empty(node.level - 1)
+        return self.join(self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+                         self.join(e, node.sw, e, e), self.join(node.se, e, e, e))
+
+    def is_padded(self, node: Node) -> bool:
+        """
+        is_padded checks whether all live cells are in the center quarter
+        (the center of the center) of node
+        """
+        return node.population == (node.nw.se.se.population + node.ne.sw.sw.population
+                                   + node.sw.ne.ne.population + node.se.nw.nw.population)
+
+    def get_cell(self, y: int, x: int) -> int:
+        node = self.root
+        # Walk down with coordinates relative to the corner of node
+        half = 1 << (node.level - 1)
+        y += half
+        x += half
+        if not (0 <= y < 2 * half and 0 <= x < 2 * half):
+            return 0
+
+        while node.level > 0 and node.population > 0:
+            half = 1 << (node.level - 1)
+            if y < half:
+                node = node.nw if x < half else node.ne
+            else:
+                node = node.sw if x < half else node.se
+            y %= half
+            x %= half
+
+        return node.population
+
+    def set_cell(self, y: int, x: int, value: int):
+        while True:
+            half = 1 << (self.root.level - 1)
+            if -half <= y < half and -half <= x < half:
+                break
+            self.root = self.expand(self.root)
+
+        self.root = self.set_node(self.root, y + half, x + half, value)
+        self.alive = self.root.population
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        """
+        load_arrays builds the tree bottom up: live cells are grouped into
+        4x4 blocks, which become level 2 nodes, and those are joined level
+        by level, so every node is created once instead of once per cell.
+        Like load_pattern, coordinates wrap around the edges of the board.
+        """
+        cells: List[Tuple[int, int]] = []
+        half = 1 << (self.root.level - 1)
+        self.collect_cells(self.root, -half, -half, cells)
+
+        # The 16 cells of a block as bits of its code, bit y * 4 + x
+        blocks: Dict[Tuple[int, int], int] = {}
+        if np is not None:
+            ys = np.concatenate(((np.asarray(ys, dtype=np.int64) + top) % self.height,
+                                 np.array([y for y, _ in cells], dtype=np.int64)))
+            xs = np.concatenate(((np.asarray(xs, dtype=np.int64) + left) % self.width,
+                                 np.array([x for _, x in cells], dtype=np.int64)))
+            if len(ys) == 0:
+                return
+            low_y, low_x = int(ys.min()) >> 2, int(xs.min()) >> 2
+            block_columns = (int(xs.max()) >> 2) - low_x + 1
+            ids, inverse = np.unique(((ys >> 2) - low_y) * block_columns + (xs >> 2) - low_x,
+                                     return_inverse=True)
+            codes = np.zeros(len(ids), dtype=np.int64)
+            np.bitwise_or.at(codes, inverse.reshape(-1), np.left_shift(1, (ys & 3) * 4 + (xs & 3)))
+            block_ys, block_xs = np.divmod(ids, block_columns)
+            blocks = dict(zip(zip((block_ys + low_y).tolist(), (block_xs + low_x).tolist()),
+                              codes.tolist()))
+            high = max(-int(ys.min()), int(ys.max()) + 1, -int(xs.min()), int(xs.max()) + 1)
+        else:
+            high = 0
+            h, w = self.height, self.width
+            for y, x in itertools.chain(zip(((top + y) % h for y in ys),
+                                            ((left + x) % w for x in xs)), cells):
+                key = (y >> 2, x >> 2)
+                blocks[key] = blocks.get(key, 0) | 1 << ((y & 3) * 4 + (x & 3))
+                high = max(high, -y, y + 1, -x, x + 1)
+            if not blocks:
+                return
+
+        level = self.root.level
+        while (1 << (level - 1)) < high:
+            level += 1
+
+        # A 2x2 quarter of a block by its bits 0, 1, 4 and 5
+        cell = (DEAD, ALIVE)
+        quarters = {bits: self.join(cell[bits & 1], cell[bits >> 1 & 1],
+                                    cell[bits >> 4 & 1], cell[bits >> 5 & 1])
+                    for bits in (0x00, 0x01, 0x02, 0x03, 0x10, 0x11, 0x12, 0x13,
+                                 0x20, 0x21, 0x22, 0x23, 0x30, 0x31, 0x32, 0x33)}
+
+        leaves: Dict[int, Node] = {}
+        nodes: Dict[Tuple[int, int], Node] = {}
+        for key, code in blocks.items():
+            node = leaves.get(code)
+            if node is None:
+                node = leaves[code] = self.join(quarters[code & 0x33], quarters[code >> 2 & 0x33],
+                                                quarters[code >> 8 & 0x33],
+                                                quarters[code >> 10 & 0x33])
+            nodes[key] = node
+
+        # Keys are positions in units of the node size, the root joins the
+        # four nodes around the origin
+        for child_level in range(2, level - 1):
+            e = self.empty(child_level)
+            parents: Dict[Tuple[int, int], Node] = {}
+            for y, x in {(y >> 1, x >> 1) for y, x in nodes}:
+                y2, x2 = y * 2, x * 2
+                parents[(y, x)] = self.join(nodes.get((y2, x2), e), nodes.get((y2, x2 + 1), e),
+                                            nodes.get((y2 + 1, x2), e),
+                                            nodes.get((y2 + 1, x2 + 1), e))
+            nodes = parents
+
+        e = self.empty(level - 1)
+        self.root = self.join(nodes.get((-1, -1), e), nodes.get((-1, 0), e),
+                              nodes.get((0, -1), e), nodes.get((0, 0), e))
+        self.alive = self.root.population
+
+    def set_node(self, node: Node, y: int, x: int, value: int) -> Node:
+        if node.level == 0:
+            return ALIVE if value else DEAD
+
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if y < half:
+            if x < half:
+                nw = self.set_node(nw, y, x, value)
+            else:
+                ne = self.set_node(ne, y, x - half, value)
+        else:
+            if x < half:
+                sw = self.set_node(sw, y - half, x, value)
+            else:
+                se = self.set_node(se, y - half, x - half, value)
+
+        return self.join(nw, ne, sw, se)
+
+    def to_list(self) -> List[List[int]]:
+        gol_map = [[0 for x in range(self.width)] for y in range(self.height)]
+        half = 1 << (self.root.level - 1)
+        self.fill_map(self.root, -half, -half, gol_map)
+
+        return gol_map
+
+    def to_packed(self) -> bytes:
+        if np is None:
+            return super().to_packed()
+
+        return np.packbits(np.array(self.to_list(), dtype=np.uint8), axis=1,
+                           bitorder="little").tobytes()
+
+    def collect_cells(self, node: Node, top: int, left: int, cells: List[Tuple[int, int]]):
+        if node.population == 0:
+            return
+
+        if node.level == 0:
+            cells.append((top, left))
+            return
+
+        half = 1 << (node.level - 1)
+        self.collect_cells(node.nw, top, left, cells)
+        self.collect_cells(node.ne, top, left + half, cells)
+        self.collect_cells(node.sw, top + half, left, cells)
+        self.collect_cells(node.se, top + half, left + half, cells)
+
+    def digest(self) -> bytes:
+        """
+        digest hashes every live cell of the plane, including the ones
+        outside of the board
+        """
+        cells: List[Tuple[int, int]] = []
+        half = 1 << (self.root.level - 1)
+        self.collect_cells(self.root, -half, -half, cells)
+
+        packed = array("q", [coordinate for cell in sorted(cells) for coordinate in cell])
+        return hashlib.blake2b(packed.tobytes(), digest_size=16).digest()
+
+    def fill_map(self, node: Node, top: int, left: int, gol_map: List[List[int]]):
+        size = 1 << node.level
+        if (node.population == 0 or top >= self.height or left >= self.width
+                or top + size <= 0 or left + size <= 0):
+            return
+
+        if node.level == 0:
+            gol_map[top][left] = 1
+            return
+
+        half = size >> 1
+        self.fill_map(node.nw, top, left, gol_map)
+        self.fill_map(node.ne, top, left + half, gol_map)
+        self.fill_map(node.sw, top + half, left, gol_map)
+        self.fill_map(node.se, top + half, left + half, gol_map)
+
+    def life_4x4(self, node: Node) -> Node:
+        """
+        life_4x4 advances the center 2x2 cells of a level 2 node by one
+        generation
+        """
+        cells = [[0] * 4 for _ in range(4)]
+        for qy, qx, quadrant in ((0, 0, node.nw), (0, 2, node.ne),
+                                 (2, 0, node.sw), (2, 2, node.se)):
+            cells[qy][qx] = quadrant.nw.population
+            cells[qy][qx + 1] = quadrant.ne.population
+            cells[qy + 1][qx] = quadrant.sw.population
+            cells[qy + 1][qx + 1] = quadrant.se.population
+
+        new_cells = []
+        for y, x in ((1, 1), (1, 2), (2, 1), (2, 2)):
+            sum_neighbours = sum(cells[y + i][x + j]
+                                 for i in range(-1, 2) for j in range(-1, 2)) - cells[y][x]
+            if self.rule.table[cells[y][x] * 9 + sum_neighbours]:
+                new_cells.append(ALIVE)
+            else:
+                new_cells.append(DEAD)
+
+        return self.join(*new_cells)
+
+    def successor(self, node: Node, j: int) -> Node:
+        """
+        successor returns the center of node, one level down, advanced by
+        2^j generations, j may be at most node.level - 2
+        """
+        if node.population == 0:
+            return node.nw
+        if node.result is not None and j in node.result:
+            return node.result[j]
+
+        if node.level == 2:
+            result = self.life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # Nine overlapping sub-squares of level - 1 each advanced by
+            # 2^j (or half of that when stepping at full speed)
+            inner = min(j, node.level - 3)
+            c1 = self.successor(nw, inner)
+            c2 = self.successor(self.join(nw.ne, ne.nw, nw.se, ne.sw), inner)
+            c3 = self.successor(ne, inner)
+            c4 = self.successor(self.join(nw.sw, nw.se, sw.nw, sw.ne), inner)
+            c5 = self.successor(self.join(nw.se, ne.sw, sw.ne, se.nw), inner)
+            c6 = self.successor(self.join(ne.sw, ne.se, se.nw, se.ne), inner)
+            c7 = self.successor(sw, inner)
+            c8 = self.successor(self.join(sw.ne, se.nw, sw.se, se.sw), inner)
+            c9 = self.successor(se, inner)
+
+            if j < node.level - 2:
+                # Already advanced far enough, only take the centers
+                result = self.join(self.join(c1.se, c2.sw, c4.ne, c5.nw),
+                                   self.join(c2.se, c3.sw, c5.ne, c6.nw),
+                                   self.join(c4.se, c5.sw, c7.ne, c8.nw),
+                                   self.join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = self.join(self.successor(self.join(c1, c2, c4, c5), inner),
+                                   self.successor(self.join(c2, c3, c5, c6), inner),
+                                   self.successor(self.join(c4, c5, c7, c8), inner),
+                                   self.successor(self.join(c5, c6, c8, c9), inner))
+
+        if node.result is None:
+            node.result = {}
+        node.result[j] = result
+
+        return result
+
+    def advance(self, j: int):
+        """
+        advance moves the board 2^j generations forward
+        """
+        root = self.root
+        # With all cells in the center quarter and at most 2^(level - 3)
+        # generations nothing can escape the level - 1 result
+        while root.level < j + 3 or not self.is_padded(root):
+            root = self.expand(root)
+
+        self.root = self.successor(root, j)
+        self.generation += 1 << j
+        self.alive = self.root.population
+
+        if len(self.table) > self.max_nodes:
+            self.collect_garbage()
+
+    def collect_garbage(self):
+        """
+        collect_garbage evicts every node not reachable from the root and
+        drops all memoised results, which may point to evicted nodes
+        """
+        table: Dict[Tuple[int, int, int, int], Node] = {}
+        stack = [self.root] + self.empty_nodes[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+
+            key = (id(node.nw), id(node.ne), id(node.sw), id(node.se))
+            if key in table:
+                continue
+
+            table[key] = node
+            stack += (node.nw, node.ne, node.sw, node.se)
+
+        for node in self.table.values():
+            node.result = None
+
+        self.table = table
+        self.collections += 1
+
+    def step(self, n: int):
+        """
+        step advances the board by n generations, taking one jump of 2^k
+        generations for every bit set in n
+        """
+        j = 0
+        while n > 0:
+            if n & 1:
+                self.advance(j)
+            n >>= 1
+            j += 1
+
+    def game_step(self):
+        self.advance(0)
@@ -0,0 +1,247 @@
+"""
+history.py
+
+History of a run, recorded as births and deaths per generation with a full
+keyframe every keyframe_interval generations. Seeking replays the deltas
+from the nearest keyframe. Old segments are spilled to disk once the
+history outgrows its memory budget, and dropped once the spilled ones
+outgrow the disk budget.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+from array import array
+from typing import List, Optional, Set, Tuple
+
+from engine import LifeEngine
+
+DEFAULT_KEYFRAME_INTERVAL = 64
+
+# Default memory budget of the in-memory history in bytes
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Default disk budget of the spilled history in bytes
+DEFAULT_DISK_BUDGET = 1024 * 1024 * 1024
+
+class Segment():
+    """
+    Segment holds the keyframe of generation start and the deltas of the
+    generations after it, up to and including generation end. Cells are
+    stored packed as y * width + x. Spilled segments only keep the path of
+    their file on disk, size is then the size of that file.
+    """
+    __slots__ = ("start", "end", "keyframe", "deltas", "path", "size")
+
+    def __init__(self, start: int, keyframe: array):
+        self.start = start
+        self.end = start
+        self.keyframe: Optional[array] = keyframe
+        self.deltas: Optional[List[Tuple[array, array]]] = []
+        self.path: Optional[str] = None
+        self.size = len(keyframe) * keyframe.itemsize
+
+class History():
+    """
+    History records the generations of engine. Call record() after every
+    change of the board (steps and edits). Recording a generation that is
+    not newer than the last one drops everything from that generation on,
+    so edits and restored generations start a new timeline. Once the
+    spilled segments outgrow disk_budget, the oldest ones are dropped, so
+    first_generation moves forward during long runs.
+    """
+    def __init__(self, engine: LifeEngine, keyframe_interval: int=DEFAULT_KEYFRAME_INTERVAL,
+                 memory_budget: int=DEFAULT_MEMORY_BUDGET, spill_dir: Optional[str]=None,
+                 disk_budget: int=DEFAULT_DISK_BUDGET):
+        if keyframe_interval < 1:
+            raise ValueError(f"keyframe_interval must be at least 1, got {keyframe_interval}")
+
+        self.engine = engine
+        self.keyframe_interval = keyframe_interval
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.spill_dir = spill_dir
+        self.own_spill_dir = False
+
+        self.segments: List[Segment] = []
+        self.memory_used = 0
+        self.disk_used = 0
+        # Cells of the last recorded generation, the base of the next delta
+        self.last_cells: Set[int] = set()
+
+    @property
+    def first_generation(self) -> Optional[int]:
+        return self.segments[0].start if self.segments else None
+
+    @property
+    def last_generation(self) -> Optional[int]:
+        return self.segments[-1].end if self.segments else None
+
+    def packed_cells(self) -> Set[int]:
+        width = self.engine.width
+        return {y * width + x for y, x in self.engine.live_cells()}
+
+    def record(self):
+        """
+        record stores the current generation of the engine
+        """
+        generation = self.engine.generation
+        cells = self.packed_cells()
+
+        if self.segments and generation <= self.last_generation:
+            self.truncate(generation)
+
+        segment = self.segments[-1] if self.segments else None
+        if (segment is None or segment.path is not None or generation != segment.end + 1
+                or len(segment.deltas) + 1 >= self.keyframe_interval):
+            segment = Segment(generation, array("q", sorted(cells)))
+            self.segments.append(segment)
+        else:
+            births = array("q", sorted(cells - self.last_cells))
+            deaths = array("q", sorted(self.last_cells - cells))
+            segment.deltas.append((births, deaths))
+            segment.end = generation
+            segment.size += (len(births) + len(deaths)) * births.itemsize
+
+        self.memory_used = sum(s.size for s in self.segments if s.path is None)
+        self.last_cells = cells
+        self.spill()
+
+    def truncate(self, generation: int):
+        """
+        truncate drops every recorded generation from generation on
+        """
+        while self.segments and self.segments[-1].start >= generation:
+            self.remove_segment(self.segments.pop())
+
+        if self.segments:
+            segment = self.segments[-1]
+            self.load_segment(segment)
+            # The delta at index i leads to generation start + i + 1
+            del segment.deltas[generation - segment.start - 1:]
+            segment.end = generation - 1
+            segment.size = len(segment.keyframe) * segment.keyframe.itemsize \
+                + sum((len(b) + len(d)) * b.itemsize for b, d in segment.deltas)
+
+            # The next delta is based on the last generation kept
+            cells = set(segment.keyframe)
+            for births, deaths in segment.deltas:
+                cells.difference_update(deaths)
+                cells.update(births)
+            self.last_cells = cells
+
+        self.memory_used = sum(s.size for s in self.segments if s.path is None)
+
+    def spill(self):
+        """
+        spill writes the oldest segments to disk until the history fits its
+        memory budget, the segment being recorded is never spilled. Spilled
+        segments beyond the disk budget are dropped, oldest first.
+        """
+        for segment in self.segments[:-1]:
+            if self.memory_used <= self.memory_budget:
+                break
+            if segment.path is not None:
+                continue
+
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix="gol-history-")
+                self.own_spill_dir = True
+
+            segment.path = os.path.join(self.spill_dir, f"segment-{segment.start}.pickle")
+            with open(segment.path, "wb") as f:
+                pickle.dump((segment.keyframe, segment.deltas), f, pickle.HIGHEST_PROTOCOL)
+
+            segment.keyframe = None
+            segment.deltas = None
+            self.memory_used -= segment.size
+            segment.size = os.path.getsize(segment.path)
+            self.disk_used += segment.size
+
+        while self.disk_used > self.disk_budget and self.segments[0].path is not None:
+            self.remove_segment(self.segments.pop(0))
+
+    def load_segment(self, segment: Segment):
+        """
+        load_segment reads a spilled segment back into memory
+        """
+        if segment.path is None:
+            return
+
+        with open(segment.path, "rb") as f:
+            segment.keyframe, segment.deltas = pickle.load(f)
+        self.remove_segment(segment)
+
+    def remove_segment(self, segment: Segment):
+        if segment.path is not None:
+            os.remove(segment.path)
+            segment.path = None
+            self.disk_used -= segment.size
+
+    def find_segment(self, generation: int) -> Segment:
+        # Segments are sorted by generation, so bisect over their starts
+        low, high = 0, len(self.segments) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.segments[middle].start <= generation:
+                low = middle
+            else:
+                high = middle - 1
+
+        segment = self.segments[low] if self.segments else None
+        if segment is None or not segment.start <= generation <= segment.end:
+            raise KeyError(f"Generation {generation} is not in the history")
+
+        return segment
+
+    def seek(self, generation: int) -> Set[Tuple[int, int]]:
+        """
+        seek returns the live cells of generation, replaying at most
+        keyframe_interval deltas
+        """
+        segment = self.find_segment(generation)
+        if segment.path is not None:
+            with open(segment.path, "rb") as f:
+                keyframe, deltas = pickle.load(f)
+        else:
+            keyframe, deltas = segment.keyframe, segment.deltas
+
+        cells = set(keyframe)
+        for births, deaths in deltas[:generation - segment.start]:
+            cells.difference_update(deaths)
+            cells.update(births)
+
+        width = self.engine.width
+        return {divmod(cell, width) for cell in cells}
+
+    def restore(self, generation: int):
+        """
+        restore puts the board of the engine back to generation, the history
+        itself is kept until something new is recorded
+        """
+        cells = self.seek(generation)
+
+        self.engine.clear()
+        self.engine.load_pattern(cells)
+        self.engine.generation = generation
+        self.last_cells = self.packed_cells()
+
+    def clear(self):
+        for segment in self.segments:
+            self.remove_segment(segment)
+
+        self.segments = []
+        self.memory_used = 0
+        self.disk_used = 0
+        self.last_cells = set()
+
+    def close(self):
+        """
+        close removes the spilled segments from disk
+        """
+        self.clear()
+        if self.own_spill_dir and self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+            self.own_spill_dir = False
@@ -0,0 +1,222 @@
+"""
+memmap.py
+
+Engine for boards larger than RAM. The board is kept bit-packed in a
+memory-mapped file and stepped one stripe of rows at a time, so only a
+few stripes are ever unpacked in memory. The file can be reopened later
+to resume the run.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+from engine import LifeEngine, np, numpy_next_rows
+from rules import CONWAY, Rule, to_rule
+
+MAGIC = b"GOLMMAP1"
+
+# magic, width, height, generation, alive, current buffer, rulestring
+HEADER = struct.Struct("<8sQQQQB23s")
+HEADER_SIZE = 64
+
+# Number of cells unpacked at once while stepping, bounds the memory used
+DEFAULT_STRIPE_CELLS = 1 << 24
+
+class MemmapLife(LifeEngine):
+    """
+    MemmapLife stores both generations bit-packed in the file at path, one
+    bit per cell with bit x % 8 of byte x // 8 being column x. Without a
+    path the board lives in a temporary file that is removed by close().
+    Use MemmapLife.open to resume a board written before.
+    """
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY, path: Optional[str]=None,
+                 stripe_cells: int=DEFAULT_STRIPE_CELLS):
+        if np is None:
+            raise ImportError("The memmap backend requires numpy to be installed")
+
+        self.own_file = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="gol-board-", suffix=".life")
+            os.close(fd)
+
+        self.stripe_cells = stripe_cells
+        self.current = 0
+        row_bytes = (width + 7) // 8
+        with open(path, "wb") as f:
+            # Only extend the file, untouched pages stay sparse on disk
+            f.truncate(HEADER_SIZE + 2 * height * row_bytes)
+        self.map_file(path, width, height)
+
+        super().__init__(width, height, pattern, rule)
+        self.table = np.array(self.rule.table, dtype=np.uint8)
+        self.write_header()
+
+    @classmethod
+    def open(cls, path: str, stripe_cells: int=DEFAULT_STRIPE_CELLS) -> "MemmapLife":
+        """
+        open resumes the board stored in the file at path, at the
+        generation it was last flushed or closed at
+        """
+        if np is None:
+            raise ImportError("The memmap backend requires numpy to be installed")
+
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a memory-mapped Game of Life board")
+
+        _, width, height, generation, alive, current, rule = HEADER.unpack_from(header)
+
+        engine = cls.__new__(cls)
+        engine.own_file = False
+        engine.stripe_cells = stripe_cells
+        engine.current = current
+        engine.width = width
+        engine.height = height
+        engine.generation = generation
+        engine.alive = alive
+        engine.rule = to_rule(rule.rstrip(b"\0").decode("ascii"))
+        engine.table = np.array(engine.rule.table, dtype=np.uint8)
+        engine.map_file(path, width, height)
+
+        return engine
+
+    def map_file(self, path: str, width: int, height: int):
+        self.path = path
+        self.row_bytes = (width + 7) // 8
+        self.stripe_rows = max(1, min(height, self.stripe_cells // width))
+
+        self.file = np.memmap(path, dtype=np.uint8, mode="r+")
+        size = height * self.row_bytes
+        self.buffers = [self.file[HEADER_SIZE + i * size:HEADER_SIZE + (i + 1) * size]
+                        .reshape(height, self.row_bytes) for i in range(2)]
+
+    @property
+    def packed_map(self):
+        return self.buffers[self.current]
+
+    def stripes(self) -> Iterable[Tuple[int, int]]:
+        for y0 in range(0, self.height, self.stripe_rows):
+            yield y0, min(y0 + self.stripe_rows, self.height)
+
+    def unpack(self, rows):
+        return np.unpackbits(rows, axis=1, count=self.width, bitorder="little")
+
+    def write_header(self):
+        self.file[:HEADER.size] = np.frombuffer(HEADER.pack(
+            MAGIC, self.width, self.height, self.generation, self.alive, self.current,
+            str(self.rule).encode("ascii")), dtype=np.uint8)
+
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        for y0, y1 in self.stripes():
+            if self.packed_map[y0:y1].any():
+                self.packed_map[y0:y1] = 0
+
+    def get_cell(self, y: int, x: int) -> int:
+        return (int(self.packed_map[y, x >> 3]) >> (x & 7)) & 1
+
+    def set_cell(self, y: int, x: int, value: int):
+        byte = int(self.packed_map[y, x >> 3])
+        self.alive += value - ((byte >> (x & 7)) & 1)
+        self.packed_map[y, x >> 3] = byte & ~(1 << (x & 7)) | (value << (x & 7))
+
+    def load_arrays(self, ys: Iterable[int], xs: Iterable[int], top: int=0, left: int=0):
+        ys = (np.asarray(ys, dtype=np.int64) + top) % self.height
+        xs = (np.asarray(xs, dtype=np.int64) + left) % self.width
+        np.bitwise_or.at(self.packed_map, (ys, xs >> 3),
+                         np.left_shift(1, xs & 7).astype(np.uint8))
+        self.alive = self.count_alive()
+
+    def count_alive(self) -> int:
+        return sum(int(np.count_nonzero(self.unpack(self.packed_map[y0:y1])))
+                   for y0, y1 in self.stripes())
+
+    def to_list(self) -> List[List[int]]:
+        return self.unpack(self.packed_map).tolist()
+
+    def to_packed(self) -> bytes:
+        return self.packed_map.tobytes()
+
+    def load_packed(self, packed):
+        rows = np.frombuffer(packed, dtype=np.uint8, count=self.height * self.row_bytes)
+        self.packed_map[:] = rows.reshape(self.height, self.row_bytes)
+        if self.width % 8:
+            # Keep the padding bits zero, digest relies on them
+            self.packed_map[:, -1] &= (1 << (self.width % 8)) - 1
+        self.alive = self.count_alive()
+
+    def live_cells(self) -> Set[Tuple[int, int]]:
+        cells = set()
+        for y0, y1 in self.stripes():
+            ys, xs = np.nonzero(self.unpack(self.packed_map[y0:y1]))
+            cells.update(zip((ys + y0).tolist(), xs.tolist()))
+
+        return cells
+
+    def digest(self) -> bytes:
+        # The padding bits of every row are always zero
+        digest = hashlib.blake2b(digest_size=16)
+        for y0, y1 in self.stripes():
+            digest.update(self.packed_map[y0:y1].tobytes())
+
+        return digest.digest()
+
+    def game_step(self):
+        """
+        game_step computes the next generation stripe by stripe, every
+        stripe is unpacked together with a one row halo above and below.
+        Empty stripes are skipped unless the rule gives birth on zero
+        neighbours.
+        """
+        src = self.buffers[self.current]
+        dst = self.buffers[1 - self.current]
+        birth_on_zero = bool(self.table[0])
+        alive = 0
+
+        for y0, y1 in self.stripes():
+            rows = src[np.arange(y0 - 1, y1 + 1) % self.height]
+            if not birth_on_zero and not rows.any():
+                if dst[y0:y1].any():
+                    dst[y0:y1] = 0
+                continue
+
+            new_rows = numpy_next_rows(self.unpack(rows), 1, y1 - y0 + 1, self.table)
+            dst[y0:y1] = np.packbits(new_rows, axis=1, bitorder="little")
+            alive += int(np.count_nonzero(new_rows))
+
+        self.alive = alive
+        self.current = 1 - self.current
+        self.generation += 1
+        self.write_header()
+
+    def flush(self):
+        """
+        flush writes the board to disk, so that it can be reopened with open
+        """
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+
+        self.flush()
+        # The mapping is closed once the last view of it is gone
+        self.buffers = []
+        self.file = None
+        if self.own_file:
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,122 @@
+"""
+parallel.py
+
+Multi-core engine. The board is split into horizontal stripes which are
+stepped in a process pool. Both generations live in shared memory, so only
+the stripe bounds are sent to the workers every generation.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Tuple, Union
+
+from engine import NumpyLife, np, numpy_next_rows
+from rules import CONWAY, Rule, to_rule
+
+# Buffers the worker processes attached to and the rule table they use,
+# set up by attach_buffers
+worker_buffers: List = []
+worker_shared_memory: List[shared_memory.SharedMemory] = []
+worker_table: List = []
+
+def attach_buffers(names: Tuple[str, str], shape: Tuple[int, int], table: List[int]):
+    """
+    attach_buffers runs once in every worker and maps both generations
+    """
+    worker_table.append(np.array(table, dtype=np.uint8))
+    for name in names:
+        shm = shared_memory.SharedMemory(name=name)
+        worker_shared_memory.append(shm)
+        worker_buffers.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+
+def step_stripe(src: int, y0: int, y1: int) -> int:
+    """
+    step_stripe writes the next generation of rows y0 to y1 of buffer src
+    into the other buffer and returns the number of live cells in them
+    """
+    new_rows = numpy_next_rows(worker_buffers[src], y0, y1, worker_table[0])
+    worker_buffers[1 - src][y0:y1] = new_rows
+
+    return int(np.count_nonzero(new_rows))
+
+class ParallelLife(NumpyLife):
+    """
+    ParallelLife steps the board in workers processes, one horizontal
+    stripe each. Every worker reads its stripe plus a one row halo from the
+    current generation and writes its rows of the next one, so the result
+    is identical to NumpyLife. Call close() to stop the pool and free the
+    shared memory.
+    """
+    def __init__(self, width: int, height: int,
+                 pattern: Optional[Iterable[Tuple[int, int]]]=None,
+                 rule: Union[str, Rule]=CONWAY, workers: Optional[int]=None):
+        if np is None:
+            raise ImportError("The parallel backend requires numpy to be installed")
+
+        # Validated before any shared memory or process is created
+        rule = to_rule(rule)
+        if width < 1 or height < 1:
+            raise ValueError(f"Board size must be positive, got {width}x{height}")
+
+        self.workers = min(workers or os.cpu_count() or 1, height)
+        self.current = 0
+
+        size = width * height
+        self.shared_memory = [shared_memory.SharedMemory(create=True, size=size)
+                              for _ in range(2)]
+        self.buffers = [np.ndarray((height, width), dtype=np.uint8, buffer=shm.buf)
+                        for shm in self.shared_memory]
+
+        # Evenly sized stripes, the remainder rows are spread over the later ones
+        bounds = [height * i // self.workers for i in range(self.workers + 1)]
+        self.stripes = list(zip(bounds[:-1], bounds[1:]))
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=attach_buffers,
+            initargs=(tuple(shm.name for shm in self.shared_memory), (height, width),
+                      rule.table))
+
+        try:
+            super().__init__(width, height, pattern, rule)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def gol_map(self):
+        return self.buffers[self.current]
+
+    def clear(self):
+        self.generation = 0
+        self.alive = 0
+
+        self.gol_map[:] = 0
+
+    def game_step(self):
+        futures = [self.pool.submit(step_stripe, self.current, y0, y1)
+                   for y0, y1 in self.stripes]
+
+        self.alive = sum(future.result() for future in futures)
+        self.current = 1 - self.current
+        self.generation += 1
+
+    def close(self):
+        """
+        close stops the pool and frees the shared memory. It may run while
+        a step was interrupted, e.g. by CTRL-C, so stripes not started yet
+        are cancelled. The segments are unlinked before they are unmapped,
+        so they are removed even if unmapping fails.
+        """
+        self.pool.shutdown(cancel_futures=True)
+        self.buffers = []
+        for shm in self.shared_memory:
+            shm.unlink()
+            shm.close()
+        self.shared_memory = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
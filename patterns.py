@@ -0,0 +1,295 @@
+"""
+patterns.py
+
+Readers for the common pattern file formats: run length encoded (.rle),
+plaintext (.cells) and Life 1.06 (.lif, .life). Files are parsed line by
+line into flat coordinate arrays, which engines load in bulk with
+LifeEngine.load_arrays. RLE bodies are decoded with numpy if it is
+installed.
+"""
+
+import os
+import re
+from array import array
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from engine import LifeEngine, create_engine, np
+from rules import CONWAY, Rule, to_rule
+
+FORMATS = ("rle", "cells", "life106")
+
+# Dead cells around a pattern on a board sized to fit it
+DEFAULT_PADDING = 16
+
+EXTENSIONS = {
+    ".rle": "rle",
+    ".cells": "cells",
+    ".lif": "life106",
+    ".life": "life106",
+}
+
+RLE_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?", re.I)
+RLE_TOKEN = re.compile(r"(\d*)([^\d\s])")
+CELLS_RUN = re.compile(r"[O*]+")
+
+# Characters of RLE body decoded at once
+RLE_CHUNK_SIZE = 1 << 20
+
+class Pattern():
+    """
+    Pattern holds the live cells of a pattern file as two parallel arrays
+    of row (ys) and column (xs) coordinates, relative to the top left
+    corner of its width x height bounding box. rule is the rule given in
+    the file, if any.
+    """
+    def __init__(self, ys: array, xs: array, width: int, height: int,
+                 rule: Optional[Rule]=None, name: Optional[str]=None):
+        self.ys = ys
+        self.xs = xs
+        self.width = width
+        self.height = height
+        self.rule = rule
+        self.name = name
+
+    def __len__(self) -> int:
+        return len(self.ys)
+
+    def cells(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.ys, self.xs)
+
+def decode_rle(body: str, ys: array, xs: array, y: int, x: int) -> Tuple[int, int]:
+    """
+    decode_rle appends the live cells of a piece of RLE body, which must
+    not end in a run count, starting at row y and column x. Returns the row
+    and column the next piece starts at.
+    """
+    if np is None:
+        for count, tag in RLE_TOKEN.findall(body):
+            count = int(count) if count else 1
+            if tag == "$":
+                y += count
+                x = 0
+            elif tag in "b.":
+                x += count
+            else:
+                ys.extend([y] * count)
+                xs.extend(range(x, x + count))
+                x += count
+
+        return y, x
+
+    data = np.frombuffer(body.encode("ascii"), dtype=np.uint8)
+    digit_places = 10.0 ** np.arange(20)
+    is_digit = (data >= ord("0")) & (data <= ord("9"))
+    tag_positions = np.flatnonzero(~is_digit)
+    if len(tag_positions) == 0:
+        return y, x
+    tags = data[tag_positions]
+
+    # Every digit belongs to the run count of the next tag
+    digit_positions = np.flatnonzero(is_digit)
+    owners = np.searchsorted(tag_positions, digit_positions)
+    places = digit_places[tag_positions[owners] - digit_positions - 1]
+    counts = np.bincount(owners, weights=(data[digit_positions] - ord("0")) * places,
+                         minlength=len(tags)).astype(np.int64)
+    counts[np.bincount(owners, minlength=len(tags)) == 0] = 1
+
+    is_row_end = tags == ord("$")
+    is_alive = ~is_row_end & (tags != ord("b")) & (tags != ord("."))
+
+    row_ends = np.where(is_row_end, counts, 0)
+    tag_ys = y + np.cumsum(row_ends) - row_ends
+
+    # Columns restart at 0 after every "$", the first row continues at x
+    advances = np.where(is_row_end, 0, counts)
+    ends = np.cumsum(advances)
+    row_starts = np.maximum.accumulate(np.where(is_row_end, ends, 0))
+    tag_xs = ends - advances - row_starts + np.where(np.cumsum(is_row_end) == 0, x, 0)
+
+    run_lengths = counts[is_alive]
+    run_offsets = np.arange(run_lengths.sum()) - np.repeat(np.cumsum(run_lengths) - run_lengths,
+                                                           run_lengths)
+    ys.frombytes(np.repeat(tag_ys[is_alive], run_lengths).astype(np.int64).tobytes())
+    xs.frombytes((np.repeat(tag_xs[is_alive], run_lengths) + run_offsets)
+                 .astype(np.int64).tobytes())
+
+    if is_row_end.any():
+        return y + int(row_ends.sum()), int(ends[-1] - row_starts[-1])
+    return y, x + int(ends[-1])
+
+def parse_rle(lines: Iterable[str]) -> Pattern:
+    """
+    parse_rle reads a run length encoded pattern. Every state other than
+    dead ("b" or ".") counts as alive. The body is decoded in chunks of
+    about RLE_CHUNK_SIZE characters.
+    """
+    ys = array("q")
+    xs = array("q")
+    width = height = 0
+    rule = name = None
+    header_seen = False
+    y = x = 0
+    chunk: List[str] = []
+    chunk_size = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not header_seen:
+            if line.startswith("#"):
+                if line[1:2] == "N":
+                    name = line[2:].strip()
+                continue
+            header_seen = True
+            match = RLE_HEADER.match(line)
+            if match:
+                width, height = int(match.group(1)), int(match.group(2))
+                if match.group(3):
+                    rule = to_rule(match.group(3).split(":")[0])
+                continue
+
+        done = "!" in line
+        if done:
+            line = line[:line.index("!")]
+        chunk.append(line)
+        chunk_size += len(line)
+
+        if done or chunk_size >= RLE_CHUNK_SIZE:
+            body = "".join("".join(chunk).split())
+            # A run count may continue on the next line
+            tail = "" if done else body[len(body.rstrip("0123456789")):]
+            y, x = decode_rle(body[:len(body) - len(tail)], ys, xs, y, x)
+            chunk = [tail]
+            chunk_size = len(tail)
+        if done:
+            break
+    else:
+        # No "!" at the end of the file, a trailing run count has no tag
+        y, x = decode_rle("".join("".join(chunk).split()).rstrip("0123456789"), ys, xs, y, x)
+
+    return bounded(ys, xs, width, height, rule, name)
+
+def parse_cells(lines: Iterable[str]) -> Pattern:
+    """
+    parse_cells reads a plaintext pattern, "O" (or "*") is a live cell
+    """
+    ys = array("q")
+    xs = array("q")
+    name = None
+    y = 0
+
+    for line in lines:
+        if line.startswith("!"):
+            if line.startswith("!Name:"):
+                name = line[len("!Name:"):].strip()
+            continue
+
+        for run in CELLS_RUN.finditer(line):
+            ys.extend([y] * (run.end() - run.start()))
+            xs.extend(range(run.start(), run.end()))
+        y += 1
+
+    return bounded(ys, xs, 0, 0, None, name)
+
+def parse_life106(lines: Iterable[str]) -> Pattern:
+    """
+    parse_life106 reads a Life 1.06 pattern, one "x y" pair per line
+    """
+    ys = array("q")
+    xs = array("q")
+
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        numbers = line.split()
+        if numbers:
+            xs.extend(map(int, numbers[0::2]))
+            ys.extend(map(int, numbers[1::2]))
+
+    if len(xs) != len(ys):
+        raise ValueError("Life 1.06 coordinates must come in x y pairs")
+
+    # Coordinates may be negative, move the bounding box to the origin
+    if ys:
+        top, left = min(ys), min(xs)
+        if top or left:
+            ys = array("q", [y - top for y in ys])
+            xs = array("q", [x - left for x in xs])
+
+    return bounded(ys, xs, 0, 0, None, None)
+
+def bounded(ys: array, xs: array, width: int, height: int,
+            rule: Optional[Rule], name: Optional[str]) -> Pattern:
+    # Grow the declared size to the bounding box of the live cells
+    if ys:
+        if np is None:
+            height = max(height, max(ys) + 1)
+            width = max(width, max(xs) + 1)
+        else:
+            height = max(height, int(np.frombuffer(ys, dtype=np.int64).max()) + 1)
+            width = max(width, int(np.frombuffer(xs, dtype=np.int64).max()) + 1)
+
+    return Pattern(ys, xs, width, height, rule, name)
+
+PARSERS = {
+    "rle": parse_rle,
+    "cells": parse_cells,
+    "life106": parse_life106,
+}
+
+def detect_format(path: str) -> str:
+    """
+    detect_format guesses the format of a pattern file from its extension,
+    or from its first line if the extension is unknown
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXTENSIONS:
+        return EXTENSIONS[extension]
+
+    with open(path) as f:
+        first_line = f.readline().strip()
+
+    if first_line.startswith("#Life 1.06"):
+        return "life106"
+    if first_line.startswith("!") or set(first_line) <= set(".O*"):
+        return "cells"
+
+    return "rle"
+
+def read_pattern(path: str, pattern_format: Optional[str]=None) -> Pattern:
+    """
+    read_pattern parses the pattern file at path, format is one of FORMATS
+    and detected from the file if not given
+    """
+    if pattern_format is None:
+        pattern_format = detect_format(path)
+    if pattern_format not in PARSERS:
+        raise ValueError(f"Unknown pattern format '{pattern_format}', expected one of {FORMATS}")
+
+    with open(path) as f:
+        return PARSERS[pattern_format](f)
+
+def place_pattern(engine: LifeEngine, pattern: Pattern):
+    """
+    place_pattern loads pattern into the center of the board of engine,
+    patterns larger than the board wrap around its edges
+    """
+    engine.load_arrays(pattern.ys, pattern.xs, (engine.height - pattern.height) // 2,
+                       (engine.width - pattern.width) // 2)
+
+def create_pattern_engine(backend: str, pattern: Pattern, padding: int=DEFAULT_PADDING,
+                          rule: Optional[Union[str, Rule]]=None, **options) -> LifeEngine:
+    """
+    create_pattern_engine returns a new engine sized to fit pattern with
+    padding dead cells on every side, running the rule of the pattern
+    unless another one is given
+    """
+    if rule is None:
+        rule = pattern.rule or CONWAY
+
+    engine = create_engine(backend, pattern.width + 2 * padding, pattern.height + 2 * padding,
+                           rule=rule, **options)
+    place_pattern(engine, pattern)
+
+    return engine
@@ -0,0 +1,93 @@
+"""
+rules.py
+
+Life-like rules in B/S notation, e.g. "B3/S23" for Conway's Game of Life.
+"""
+
+from typing import FrozenSet, Iterable, List, Union
+
+# Common Life-like rules, usable by name wherever a rulestring is expected
+NAMED_RULES = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "seeds": "B2/S",
+    "daynight": "B3678/S34678",
+    "lifewithoutdeath": "B3/S012345678",
+    "diamoeba": "B35678/S5678",
+    "2x2": "B36/S125",
+    "morley": "B368/S245",
+}
+
+def rule_table(birth: Iterable[int], survival: Iterable[int]) -> List[int]:
+    """
+    rule_table compiles a rule into a lookup table of the next state,
+    indexed by state * 9 + number of live neighbours
+    """
+    birth = set(birth)
+    survival = set(survival)
+
+    return [1 if count in birth else 0 for count in range(9)] \
+        + [1 if count in survival else 0 for count in range(9)]
+
+class Rule():
+    """
+    Rule is a Life-like rule, a dead cell is born when its number of live
+    neighbours is in birth and a live cell survives when it is in survival.
+    """
+    def __init__(self, birth: Iterable[int], survival: Iterable[int]):
+        self.birth: FrozenSet[int] = frozenset(birth)
+        self.survival: FrozenSet[int] = frozenset(survival)
+
+        if not all(0 <= count <= 8 for count in self.birth | self.survival):
+            raise ValueError("Neighbour counts of a rule must be between 0 and 8")
+
+        self.table = rule_table(self.birth, self.survival)
+
+    @classmethod
+    def parse(cls, rulestring: str) -> "Rule":
+        """
+        parse reads a rule in B/S notation ("B36/S23"), in the older S/B
+        notation ("23/36") or by its name in NAMED_RULES
+        """
+        text = NAMED_RULES.get(rulestring.strip().lower(), rulestring).strip().upper()
+        parts = text.split("/")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid rule '{rulestring}', expected e.g. B3/S23")
+
+        birth = survival = None
+        if parts[0].startswith(("B", "S")) and parts[1].startswith(("B", "S")):
+            for part in parts:
+                if part.startswith("B"):
+                    birth = part[1:]
+                else:
+                    survival = part[1:]
+        elif not parts[0].startswith(("B", "S")) and not parts[1].startswith(("B", "S")):
+            survival, birth = parts
+
+        if birth is None or survival is None \
+                or not all(count.isdigit() for count in birth + survival):
+            raise ValueError(f"Invalid rule '{rulestring}', expected e.g. B3/S23")
+
+        return cls((int(count) for count in birth), (int(count) for count in survival))
+
+    @property
+    def is_conway(self) -> bool:
+        return self.birth == {3} and self.survival == {2, 3}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Rule) and (self.birth, self.survival) == (other.birth, other.survival)
+
+    def __hash__(self) -> int:
+        return hash((self.birth, self.survival))
+
+    def __str__(self) -> str:
+        return "B" + "".join(map(str, sorted(self.birth))) \
+            + "/S" + "".join(map(str, sorted(self.survival)))
+
+    def __repr__(self) -> str:
+        return f"Rule.parse('{self}')"
+
+CONWAY = Rule((3,), (2, 3))
+
+def to_rule(rule: Union[str, Rule]) -> Rule:
+    return rule if isinstance(rule, Rule) else Rule.parse(rule)
@@ -0,0 +1,87 @@
+"""
+scheduler.py
+
+Timing of the main loop. The simulation and the display run at separate
+rates: generations are stepped as fast as the engine allows or at a
+target rate, while frames are drawn at most at a capped rate and always
+show the latest generation, skipping the ones stepped in between.
+"""
+
+import time
+from typing import Optional
+
+# Generations per second of the interactive game, unless configured
+DEFAULT_SPEED = 20.0
+
+# Frames drawn per second at most
+DEFAULT_FPS = 30.0
+
+class Scheduler():
+    """
+    Scheduler tells the main loop when to step and when to draw. speed is
+    the target rate in generations per second, None (or 0) steps as fast as
+    possible. fps caps the rate frames are drawn at.
+
+    A frame is due fps after the previous one was drawn, so slow frames
+    never starve the simulation. When stepping falls behind the target
+    speed, it catches up by at most one frame worth of generations rather
+    than bursting through all of them.
+    """
+    def __init__(self, speed: Optional[float]=DEFAULT_SPEED, fps: float=DEFAULT_FPS):
+        if speed is not None and speed < 0:
+            raise ValueError(f"speed must not be negative, got {speed}")
+        if fps <= 0:
+            raise ValueError(f"fps must be positive, got {fps}")
+
+        self.step_interval = 1 / speed if speed else 0.0
+        self.frame_interval = 1 / fps
+        now = time.monotonic()
+        self.next_step = now
+        self.next_frame = now
+
+        self.steps = 0
+        self.frames = 0
+        self.rate_start = now
+        self.rate_steps = 0
+        # Measured over about a second, None until then
+        self.generations_per_second: Optional[float] = None
+
+    def frame_due(self) -> bool:
+        return time.monotonic() >= self.next_frame
+
+    def step_due(self) -> bool:
+        return time.monotonic() >= self.next_step
+
+    def frame_drawn(self):
+        now = time.monotonic()
+        self.next_frame = now + self.frame_interval
+        self.frames += 1
+
+        if now - self.rate_start >= 1:
+            self.generations_per_second = (self.steps - self.rate_steps) / (now - self.rate_start)
+            self.rate_start = now
+            self.rate_steps = self.steps
+
+    def stepped(self):
+        self.steps += 1
+        if self.step_interval:
+            self.next_step = max(self.next_step + self.step_interval,
+                                 time.monotonic() - self.frame_interval)
+
+    def resume(self):
+        """
+        resume restarts the timing after the game was paused, so paused
+        time is neither caught up on nor counted in the measured speed
+        """
+        now = time.monotonic()
+        self.next_step = now
+        self.rate_start = now
+        self.rate_steps = self.steps
+
+    def wait(self):
+        """
+        wait sleeps until the next step or frame is due
+        """
+        delay = min(self.next_step, self.next_frame) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,168 @@
+"""
+snapshot.py
+
+Snapshots of a running board in a compact binary format: a fixed size
+header followed by the board bit-packed row by row (see
+LifeEngine.to_packed), optionally compressed with zlib or lzma.
+Uncompressed snapshots are memory-mapped when read, so the board is not
+copied before it is loaded into an engine.
+"""
+
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from typing import Optional, Tuple
+
+from engine import LifeEngine, create_engine, unpack_cells
+from patterns import Pattern
+from rules import Rule, to_rule
+
+MAGIC = b"GOLSNAP1"
+VERSION = 1
+
+COMPRESSIONS = ("none", "zlib", "lzma")
+
+# magic, version, compression, width, height, generation, alive, cursor y,
+# cursor x, payload size, rulestring
+HEADER = struct.Struct("<8sBB2xIIQQIIQ28s")
+
+# Compression levels, chosen for speed so that saving stays disk bound
+ZLIB_LEVEL = 1
+LZMA_PRESET = 0
+
+class Snapshot():
+    """
+    Snapshot is a board captured for or read from a snapshot file. packed
+    holds the board in the format of LifeEngine.to_packed, for uncompressed
+    files it is a view into the memory-mapped file. Call close() once done
+    with a snapshot that was read.
+    """
+    def __init__(self, width: int, height: int, generation: int, alive: int,
+                 cursor: Tuple[int, int], rule: Rule, compression: str, packed,
+                 mapping: Optional[mmap.mmap]=None):
+        self.width = width
+        self.height = height
+        self.generation = generation
+        self.alive = alive
+        self.cursor = cursor
+        self.rule = rule
+        self.compression = compression
+        self.packed = packed
+        self.mapping = mapping
+
+    def restore(self, engine: LifeEngine):
+        """
+        restore puts the snapshot onto the board of engine, which must have
+        the size of the snapshot
+        """
+        if (engine.width, engine.height) != (self.width, self.height):
+            raise ValueError(f"Snapshot of a {self.width}x{self.height} board does not fit "
+                             f"a {engine.width}x{engine.height} board")
+
+        engine.load_packed(self.packed)
+        engine.generation = self.generation
+
+    def create_engine(self, backend: str, **options) -> LifeEngine:
+        """
+        create_engine returns a new engine of the given backend holding the
+        snapshot
+        """
+        engine = create_engine(backend, self.width, self.height, rule=self.rule, **options)
+        self.restore(engine)
+
+        return engine
+
+    def to_pattern(self) -> Pattern:
+        """
+        to_pattern returns the board as a pattern, e.g. to place it on a
+        board of another size
+        """
+        ys, xs = unpack_cells(self.packed, self.width, self.height)
+        return Pattern(ys, xs, self.width, self.height, self.rule)
+
+    def close(self):
+        if isinstance(self.packed, memoryview):
+            self.packed.release()
+        self.packed = None
+
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def save_snapshot(path: str, engine: LifeEngine, cursor: Tuple[int, int]=(0, 0),
+                  compression: str="none"):
+    """
+    save_snapshot writes the board of engine and the cursor position to
+    path. The file is replaced atomically, a crash while saving leaves the
+    previous snapshot intact.
+    """
+    write_snapshot(path, Snapshot(engine.width, engine.height, engine.generation, engine.alive,
+                                  cursor, engine.rule, compression, engine.to_packed()))
+
+def write_snapshot(path: str, snapshot: Snapshot):
+    """
+    write_snapshot writes snapshot to path, compressed as given by
+    snapshot.compression
+    """
+    compression = snapshot.compression
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+
+    packed = snapshot.packed
+    if compression == "zlib":
+        packed = zlib.compress(packed, ZLIB_LEVEL)
+    elif compression == "lzma":
+        packed = lzma.compress(packed, preset=LZMA_PRESET)
+
+    header = HEADER.pack(MAGIC, VERSION, COMPRESSIONS.index(compression),
+                         snapshot.width, snapshot.height, snapshot.generation, snapshot.alive,
+                         snapshot.cursor[0], snapshot.cursor[1], len(packed),
+                         str(snapshot.rule).encode("ascii"))
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        f.write(packed)
+    os.replace(temporary_path, path)
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    read_snapshot reads the snapshot at path. Uncompressed boards stay in
+    the memory-mapped file until the snapshot is closed.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"'{path}' is not a Game of Life snapshot")
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, version, compression, width, height, generation, alive, cursor_y, cursor_x,
+     size, rule) = HEADER.unpack_from(mapping)
+    if magic != MAGIC or version != VERSION or compression >= len(COMPRESSIONS):
+        mapping.close()
+        raise ValueError(f"'{path}' is not a Game of Life snapshot of version {VERSION}")
+
+    compression = COMPRESSIONS[compression]
+    if compression == "none":
+        packed = memoryview(mapping)[HEADER.size:HEADER.size + size]
+    else:
+        payload = mapping[HEADER.size:HEADER.size + size]
+        mapping.close()
+        mapping = None
+        packed = zlib.decompress(payload) if compression == "zlib" else lzma.decompress(payload)
+
+    if len(packed) != height * ((width + 7) // 8):
+        if mapping is not None:
+            packed.release()
+            mapping.close()
+        raise ValueError(f"Snapshot '{path}' is truncated")
+
+    return Snapshot(width, height, generation, alive, (cursor_y, cursor_x),
+                    to_rule(rule.rstrip(b"\0").decode("ascii")), compression, packed, mapping)
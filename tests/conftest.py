@@ -0,0 +1,9 @@
+"""
+The modules live at the repository root, put it on sys.path so the tests
+run under plain pytest from any directory
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,64 @@
+"""
+Regression tests of History: new timelines started by restoring an older
+generation or by editing the board must replay the boards they recorded.
+"""
+
+from engine import create_engine
+from history import History
+
+R_PENTOMINO = {(10, 11), (10, 12), (11, 10), (11, 11), (12, 11)}
+
+def recorded_run(generations: int, keyframe_interval: int=64):
+    engine = create_engine("python", 32, 32)
+    engine.load_pattern(R_PENTOMINO)
+    history = History(engine, keyframe_interval)
+    history.record()
+    for _ in range(generations):
+        engine.game_step()
+        history.record()
+
+    return engine, history
+
+def test_restore_then_step():
+    engine, history = recorded_run(8)
+    history.restore(4)
+
+    boards = {}
+    for _ in range(3):
+        engine.game_step()
+        history.record()
+        boards[engine.generation] = engine.live_cells()
+
+    for generation, cells in boards.items():
+        assert history.seek(generation) == cells
+    assert history.last_generation == 7
+
+def test_edit_then_seek():
+    for keyframe_interval in (64, 3):
+        engine, history = recorded_run(5, keyframe_interval)
+        engine.toggle_cell(0, 0)
+        history.record()
+
+        boards = {engine.generation: engine.live_cells()}
+        for _ in range(4):
+            engine.game_step()
+            history.record()
+            boards[engine.generation] = engine.live_cells()
+
+        for generation, cells in boards.items():
+            assert history.seek(generation) == cells
+
+def test_disk_budget():
+    engine = create_engine("python", 32, 32)
+    engine.load_pattern(R_PENTOMINO)
+    history = History(engine, keyframe_interval=4, memory_budget=0, disk_budget=20000)
+    history.record()
+    for _ in range(200):
+        engine.game_step()
+        history.record()
+
+    assert 0 < history.disk_used <= 20000
+    assert history.first_generation > 0
+    assert history.seek(history.first_generation)
+    history.restore(history.first_generation + 1)
+    history.close()
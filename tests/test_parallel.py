@@ -0,0 +1,27 @@
+"""
+The parallel engine must step bit-identically to the serial engines, for
+any number of stripes and any rule.
+"""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from engine import create_engine
+
+@pytest.mark.parametrize("rule", ["B3/S23", "B36/S23", "B0/S8", "B2/S"])
+@pytest.mark.parametrize("workers", [1, 2, 3, 7])
+def test_matches_serial(rule, workers):
+    parallel = create_engine("parallel", 37, 23, rule=rule, workers=workers)
+    python = create_engine("python", 37, 23, rule=rule)
+    try:
+        parallel.generate_random_map(0.35, 11)
+        python.load_packed(parallel.to_packed())
+
+        for _ in range(12):
+            parallel.game_step()
+            python.game_step()
+            assert parallel.to_packed() == python.to_packed()
+            assert parallel.alive == python.alive
+    finally:
+        parallel.close()